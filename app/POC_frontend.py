@@ -1,6 +1,7 @@
 # frontend.py
 import json
 import os
+import time
 from datetime import date, datetime
 
 import pandas as pd
@@ -13,6 +14,7 @@ st.set_page_config(page_title="Mediclaim Processor", layout="wide")
 API_BASE_URL = "http://127.0.0.1:8000/api/v1"
 CONFIDENCE_THRESHOLD = 0.8
 CACHE_DIR = ".streamlit_cache"  # Directory to store cached JSON responses
+POLL_INTERVAL_SECONDS = 2  # How often to poll a queued extraction for its result
 
 
 # --- Helper Functions ---
@@ -78,6 +80,9 @@ else:
         st.session_state.extracted_data = None
     if "adjudicated_data" not in st.session_state:
         st.session_state.adjudicated_data = None
+    # The claim created by /extract, which /adjudicate then completes
+    if "claim_id" not in st.session_state:
+        st.session_state.claim_id = None
 
     # --- Step 1: Extraction ---
     st.header("Step 1: Extract Data from Bill")
@@ -101,6 +106,7 @@ else:
                 with open(cache_path, "r") as f:
                     st.session_state.extracted_data = json.load(f)
                 st.session_state.adjudicated_data = None
+                st.session_state.claim_id = None
                 st.success("Data loaded from cache! Please review below.")
             else:
                 # If no cache, call the API
@@ -112,10 +118,28 @@ else:
                     response = requests.post(
                         f"{API_BASE_URL}/claims/extract", files=files, headers=headers
                     )
-                    if response.status_code == 200:
-                        extracted_data = response.json()
+                    # The bill is queued for extraction; poll until the worker is done
+                    if response.status_code == 202:
+                        claim_id = response.json()["claim_id"]
+                        while True:
+                            response = requests.get(
+                                f"{API_BASE_URL}/claims/{claim_id}/status",
+                                headers=headers,
+                            )
+                            if response.status_code != 200:
+                                break
+                            claim_status = response.json()
+                            if claim_status["status"] not in ("queued", "processing"):
+                                break
+                            time.sleep(POLL_INTERVAL_SECONDS)
+                    if (
+                        response.status_code == 200
+                        and response.json()["status"] == "extracted"
+                    ):
+                        extracted_data = response.json()["extracted_data"]
                         st.session_state.extracted_data = extracted_data
                         st.session_state.adjudicated_data = None
+                        st.session_state.claim_id = claim_id
 
                         # Save the successful response to the cache file
                         with open(cache_path, "w") as f:
@@ -329,6 +353,8 @@ else:
                 "policy_number": policy_number,
                 "insurance_provider": insurance_provider,
             }
+            if st.session_state.claim_id:
+                params["claim_id"] = st.session_state.claim_id
 
             with st.spinner("Applying rules and adjudicating..."):
                 response = requests.post(
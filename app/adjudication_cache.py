@@ -0,0 +1,133 @@
+# app/adjudication_cache.py
+
+import functools
+import hashlib
+import logging
+import sqlite3
+from enum import Enum
+
+from pydantic import TypeAdapter
+
+from app.data.master_data import POLICY_RULEBOOK
+from app.pydantic_schemas import AdjudicatedClaim, ExtractedData, InsuranceDetails
+
+logger = logging.getLogger(__name__)
+
+_INSURANCE_DETAILS_ADAPTER = TypeAdapter(InsuranceDetails)
+_POLICY_ADAPTER = TypeAdapter(dict)
+
+
+class CacheMode(str, Enum):
+    """How the adjudication replay cache is used."""
+
+    ENABLED = "ENABLED"  # Return stored results, store new ones
+    READ_ONLY = "READ_ONLY"  # Return stored results, never store
+    REPLAY = "REPLAY"  # Return stored results, a miss is an error
+    WRITE_ONLY = "WRITE_ONLY"  # Always adjudicate, store the result
+    DISABLED = "DISABLED"
+
+
+class AdjudicationCacheMiss(LookupError):
+    """Raised in REPLAY mode when a claim has no stored result."""
+
+
+def adjudication_key(
+    extracted_data: ExtractedData, insurance_details: InsuranceDetails
+) -> str:
+    """
+    A hash of everything an adjudication depends on: the bill, the insurance
+    details and the policy's current rulebook entry, so editing a policy's
+    rules invalidates its stored results.
+    """
+    digest = hashlib.sha256()
+    digest.update(extracted_data.model_dump_json().encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(_INSURANCE_DETAILS_ADAPTER.dump_json(insurance_details))
+    digest.update(b"\x00")
+    policy = POLICY_RULEBOOK.get(insurance_details.policy_number)
+    digest.update(_POLICY_ADAPTER.dump_json(policy or {}))
+    return digest.hexdigest()
+
+
+class AdjudicationCache:
+    """
+    A persistent SQLite store of finished adjudications, so re-running the same
+    claims (e.g. while evaluating rule changes) doesn't repeat the LLM calls.
+    """
+
+    def __init__(self, path: str, mode: CacheMode):
+        self.path = path
+        self.mode = CacheMode(mode)
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def reads(self) -> bool:
+        return self.mode in (CacheMode.ENABLED, CacheMode.READ_ONLY, CacheMode.REPLAY)
+
+    @property
+    def writes(self) -> bool:
+        return self.mode in (CacheMode.ENABLED, CacheMode.WRITE_ONLY)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS adjudications "
+                "(key TEXT PRIMARY KEY, adjudicated_claim TEXT NOT NULL)"
+            )
+        return self._connection
+
+    def get(self, key: str) -> AdjudicatedClaim | None:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT adjudicated_claim FROM adjudications WHERE key = ?", (key,)
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        return AdjudicatedClaim.model_validate_json(row[0])
+
+    def set(self, key: str, adjudicated_claim: AdjudicatedClaim) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO adjudications VALUES (?, ?)",
+                (key, adjudicated_claim.model_dump_json()),
+            )
+
+
+def cached_adjudication(cache: AdjudicationCache):
+    """
+    Decorates an async `(extracted_data, insurance_details) -> AdjudicatedClaim`
+    pipeline so it is served from, and recorded to, `cache` according to the
+    cache's mode.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(
+            extracted_data: ExtractedData, insurance_details: InsuranceDetails
+        ) -> AdjudicatedClaim:
+            if cache.mode is CacheMode.DISABLED:
+                return await func(extracted_data, insurance_details)
+
+            key = adjudication_key(extracted_data, insurance_details)
+            if cache.reads:
+                adjudicated_claim = cache.get(key)
+                if adjudicated_claim is not None:
+                    logger.info("Adjudication cache hit for %s", key)
+                    return adjudicated_claim
+                if cache.mode is CacheMode.REPLAY:
+                    raise AdjudicationCacheMiss(
+                        f"No stored adjudication for {key} in REPLAY mode."
+                    )
+
+            adjudicated_claim = await func(extracted_data, insurance_details)
+            if cache.writes:
+                cache.set(key, adjudicated_claim)
+            return adjudicated_claim
+
+        return wrapper
+
+    return decorator
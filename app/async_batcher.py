@@ -0,0 +1,76 @@
+# app/async_batcher.py
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBatcher:
+    """
+    Collects items submitted by concurrent callers and hands them to
+    `process_batch` together, once `max_batch_size` items are waiting or the
+    oldest has waited `max_queue_time` seconds. Each caller gets back the result
+    at its own position in the batch, or has it raised if it is an exception.
+    """
+
+    def __init__(self, max_batch_size: int = 16, max_queue_time: float = 0.02):
+        self.max_batch_size = max_batch_size
+        self.max_queue_time = max_queue_time
+        self._pending: list[tuple[object, asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        # Keeps running batches referenced until they finish
+        self._running: set[asyncio.Task] = set()
+
+    async def process_batch(self, items: list) -> list:
+        """
+        Processes a batch, returning one result per item in the same order. An
+        exception in place of a result fails only that item's caller; raising
+        fails the whole batch.
+        """
+        raise NotImplementedError
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_queue_time, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: list[tuple[object, asyncio.Future]]) -> None:
+        logger.debug("Processing a batch of %d items", len(batch))
+        try:
+            results = await self.process_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(
+                    f"process_batch returned {len(results)} results for {len(batch)} items"
+                )
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -7,7 +7,9 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 import bcrypt
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from . import database_schema as models
 from .config import settings
@@ -46,18 +48,18 @@ def get_password_hash(password: str) -> str:
     return hashed.decode('utf-8')
 
 
-def get_user(db: Session, username: str):
+async def get_user(db: AsyncSession, username: str):
     """Fetches a user from the database by username."""
 
     # --- FIX: Add .options(joinedload(...)) to eagerly load the role ---
-    return (
-        db.query(models.User)
+    result = await db.execute(
+        select(models.User)
         .options(
             joinedload(models.User.role)
         )  # This tells SQLAlchemy to fetch the role too
-        .filter(models.User.username == username)
-        .first()
+        .where(models.User.username == username)
     )
+    return result.scalars().first()
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -77,7 +79,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 
 async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -94,7 +96,7 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = get_user(db, username=username)
+    user = await get_user(db, username=username)
     if user is None:
         raise credentials_exception
 
@@ -107,7 +109,7 @@ async def get_current_user(
 
 
 async def get_current_admin_user(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)
 ):
     """
     Dependency to ensure the current user is an administrator.
@@ -0,0 +1,82 @@
+# app/circuit_breaker.py
+
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of making a call while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency for a while. Once `failure_threshold`
+    calls fail within `window` seconds the circuit opens and calls are rejected
+    straight away for `cooldown` seconds. After that a single trial call goes
+    through while the rest are still rejected: its success closes the circuit,
+    its failure opens it for another cooldown.
+    """
+
+    def __init__(
+        self, name: str, failure_threshold: int, window: float, cooldown: float
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.cooldown = cooldown
+        self._failures: deque[float] = deque()
+        self._opened_at: float | None = None
+        self._trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls are being rejected."""
+        return self._opened_at is not None and (
+            self._trial_running or time.monotonic() - self._opened_at < self.cooldown
+        )
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("%s circuit closed", self.name)
+        self._failures.clear()
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        now = time.monotonic()
+        self._failures.append(now)
+        while now - self._failures[0] > self.window:
+            self._failures.popleft()
+        if self._opened_at is not None or len(self._failures) >= self.failure_threshold:
+            if self._opened_at is None:
+                logger.warning(
+                    "%s circuit opened after %d failures",
+                    self.name,
+                    len(self._failures),
+                )
+            self._opened_at = now
+
+    async def call(self, make_call: Callable[[], Awaitable]):
+        """
+        Awaits `make_call()`, or raises CircuitOpenError without calling it.
+        """
+        if self.is_open:
+            raise CircuitOpenError(f"{self.name} is unavailable, try again shortly.")
+        # Past the cooldown, this call is the trial that decides the circuit
+        trial = self._opened_at is not None
+        self._trial_running = trial
+        try:
+            result = await make_call()
+        except Exception:
+            self.record_failure()
+            raise
+        finally:
+            if trial:
+                self._trial_running = False
+        # A call that started before the circuit opened doesn't close it
+        if trial or self._opened_at is None:
+            self.record_success()
+        return result
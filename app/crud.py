@@ -2,15 +2,16 @@
 
 from uuid import UUID
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import auth
 from . import database_schema as models
 from . import pydantic_schemas as schemas
 
 
-def create_claim_record(
-    db: Session,
+async def create_claim_record(
+    db: AsyncSession,
     user: schemas.User,
     policy_id: str,
     extracted_data: schemas.ExtractedData,
@@ -32,64 +33,156 @@ def create_claim_record(
     # Add the new record to the session, commit it to the database,
     # and refresh the instance to get the new claim_id
     db.add(db_claim)
-    db.commit()
-    db.refresh(db_claim)
+    await db.commit()
+    await db.refresh(db_claim)
 
     return db_claim
 
 
-def get_claim_by_id(db: Session, claim_id: UUID) -> models.Claim | None:
+async def complete_claim_record(
+    db: AsyncSession,
+    db_claim: models.Claim,
+    policy_id: str,
+    adjudicated_claim: schemas.AdjudicatedClaim,
+) -> models.Claim:
+    """
+    Stores the adjudication of a claim created by /extract. The worker's
+    extraction stays in `extracted_data`; the reviewed bill is part of the
+    adjudicated claim.
+    """
+    db_claim.policy_id = policy_id
+    db_claim.status = "completed"
+    db_claim.adjudicated_data = adjudicated_claim.model_dump(mode="json")
+    await db.commit()
+    await db.refresh(db_claim)
+    return db_claim
+
+
+async def create_extraction_claim(
+    db: AsyncSession, user: schemas.User, filename: str | None
+) -> models.Claim:
+    """
+    Creates a placeholder claim for an uploaded bill that is waiting in the
+    extraction queue. The worker fills in `extracted_data` once it is done.
+    """
+    db_claim = models.Claim(
+        submitted_by_user_id=user.user_id,
+        status="queued",
+        original_pdf_filename=filename,
+    )
+    db.add(db_claim)
+    await db.commit()
+    await db.refresh(db_claim)
+    return db_claim
+
+
+async def update_claim_sanity_check(
+    db: AsyncSession,
+    claim_id: UUID,
+    sanity_check_result: schemas.SanityCheckResult,
+) -> models.Claim | None:
+    """
+    Stores the result of a background sanity check on an adjudicated claim.
+    """
+    db_claim = await get_claim_by_id(db, claim_id=claim_id)
+    if db_claim is None:
+        return None
+    # A new dict, so SQLAlchemy sees the JSONB column as changed
+    db_claim.adjudicated_data = {
+        **db_claim.adjudicated_data,
+        "sanity_check_result": sanity_check_result.model_dump(mode="json"),
+    }
+    await db.commit()
+    await db.refresh(db_claim)
+    return db_claim
+
+
+async def update_claim_extraction(
+    db: AsyncSession,
+    claim_id: UUID,
+    status: str,
+    extracted_data: schemas.ExtractedDataWithConfidence | None = None,
+) -> models.Claim | None:
+    """
+    Records the outcome of a background extraction job on its claim.
+    """
+    db_claim = await get_claim_by_id(db, claim_id=claim_id)
+    if db_claim is None:
+        return None
+    db_claim.status = status
+    if extracted_data is not None:
+        db_claim.extracted_data = extracted_data.model_dump(mode="json")
+    await db.commit()
+    await db.refresh(db_claim)
+    return db_claim
+
+
+async def get_claim_by_id(db: AsyncSession, claim_id: UUID) -> models.Claim | None:
     """
     Fetches a single claim from the database by its UUID.
     """
-    return db.query(models.Claim).filter(models.Claim.claim_id == claim_id).first()
+    result = await db.execute(
+        select(models.Claim).where(models.Claim.claim_id == claim_id)
+    )
+    return result.scalars().first()
 
 
-def get_claims_by_user(
-    db: Session, user_id: int, skip: int = 0, limit: int = 100
+async def get_claims_by_user(
+    db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100
 ) -> list[models.Claim]:
     """
     Fetches a paginated list of claims submitted by a specific user.
     """
-    return (
-        db.query(models.Claim)
-        .filter(models.Claim.submitted_by_user_id == user_id)
+    result = await db.execute(
+        select(models.Claim)
+        .where(models.Claim.submitted_by_user_id == user_id)
         .order_by(models.Claim.created_at.desc())
         .offset(skip)
         .limit(limit)
-        .all()
     )
+    return list(result.scalars().all())
 
 
-def get_user_by_id(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.user_id == user_id).first()
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    result = await db.execute(select(models.User).where(models.User.user_id == user_id))
+    return result.scalars().first()
 
 
 # import joinedload
 from sqlalchemy.orm import joinedload
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100):
     """Fetches a paginated list of all users."""
 
     # --- FIX: Add .options(joinedload(...)) to eagerly load the role ---
-    return (
-        db.query(models.User)
+    result = await db.execute(
+        select(models.User)
         .options(
             joinedload(models.User.role)
         )  # This tells SQLAlchemy to fetch the role too
         .order_by(models.User.user_id)
         .offset(skip)
         .limit(limit)
-        .all()
     )
+    return list(result.scalars().all())
+
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
 
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(models.User).filter(models.User.email == email).first()
+async def _get_user_with_role(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(models.User)
+        .options(joinedload(models.User.role))
+        .where(models.User.user_id == user_id)
+    )
+    return result.scalars().first()
 
 
-def create_user(db: Session, user: schemas.UserCreate):
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
     hashed_password = auth.get_password_hash(user.password)
     db_user = models.User(
         username=user.username,
@@ -99,20 +192,17 @@ def create_user(db: Session, user: schemas.UserCreate):
         role_id=user.role_id,
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
 
     # --- FIX: After creating, re-fetch the user with the role loaded ---
-    return (
-        db.query(models.User)
-        .options(joinedload(models.User.role))
-        .filter(models.User.user_id == db_user.user_id)
-        .first()
-    )
+    return await _get_user_with_role(db, db_user.user_id)
 
 
-def update_user(db: Session, user_id: int, user_update: schemas.UserUpdateAdmin):
-    db_user = get_user_by_id(db, user_id)
+async def update_user(
+    db: AsyncSession, user_id: int, user_update: schemas.UserUpdateAdmin
+):
+    db_user = await get_user_by_id(db, user_id)
     if not db_user:
         return None
     update_data = user_update.model_dump(exclude_unset=True)
@@ -123,44 +213,45 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdateAdmin)
     for key, value in update_data.items():
         setattr(db_user, key, value)
 
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
 
     # --- FIX: After updating, re-fetch the user with the role loaded ---
-    return (
-        db.query(models.User)
-        .options(joinedload(models.User.role))
-        .filter(models.User.user_id == db_user.user_id)
-        .first()
-    )
+    return await _get_user_with_role(db, db_user.user_id)
 
 
-def get_policies(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Policy).offset(skip).limit(limit).all()
+async def get_policies(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.execute(select(models.Policy).offset(skip).limit(limit))
+    return list(result.scalars().all())
 
 
-def get_policy_by_id(db: Session, policy_id: str):
-    return db.query(models.Policy).filter(models.Policy.policy_id == policy_id).first()
+async def get_policy_by_id(db: AsyncSession, policy_id: str):
+    result = await db.execute(
+        select(models.Policy).where(models.Policy.policy_id == policy_id)
+    )
+    return result.scalars().first()
 
 
-def update_policy(db: Session, policy_id: str, policy_update: schemas.Policy):
-    db_policy = get_policy_by_id(db, policy_id)
+async def update_policy(
+    db: AsyncSession, policy_id: str, policy_update: schemas.Policy
+):
+    db_policy = await get_policy_by_id(db, policy_id)
     if not db_policy:
         return None
     db_policy.policy_name = policy_update.policy_name
     db_policy.rules = policy_update.rules
-    db.commit()
-    db.refresh(db_policy)
+    await db.commit()
+    await db.refresh(db_policy)
     return db_policy
 
 
-def get_user(db: Session, username: str):
+async def get_user(db: AsyncSession, username: str):
     """
     Fetches a single user from the database by their username.
     """
-    return (
-        db.query(models.User)
+    result = await db.execute(
+        select(models.User)
         .options(joinedload(models.User.role))
-        .filter(models.User.username == username)
-        .first()
+        .where(models.User.username == username)
     )
+    return result.scalars().first()
@@ -1,24 +1,41 @@
 # app/database.py
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from .config import settings
 
 # Create the SQLAlchemy engine
+# The sync engine is used by the setup scripts in scripts/, which run outside
+# of an event loop.
 engine = create_engine(settings.DATABASE_URL)
 
 # Each instance of SessionLocal will be a database session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _async_database_url(url: str):
+    """Points a postgresql:// URL at the asyncpg driver."""
+    db_url = make_url(url)
+    if db_url.get_backend_name() == "postgresql":
+        db_url = db_url.set(drivername="postgresql+asyncpg")
+    return db_url
+
+
+# The async engine is used by the API so DB round-trips don't block the event loop
+async_engine = create_async_engine(_async_database_url(settings.DATABASE_URL))
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
 # Base class for our SQLAlchemy models to inherit from
 Base = declarative_base()
 
 
 # Dependency for API endpoints to get a DB session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -3,11 +3,13 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import auth, crud, pydantic_schemas
 from ..database import get_db
 from ..limiter import limiter
+from ..profiling import claim_traces, stage_percentiles
+from ..rule_match_cache import cache_hit_rates
 
 admin_router = APIRouter()
 
@@ -17,45 +19,45 @@ admin_router = APIRouter()
     "/users", response_model=pydantic_schemas.User, status_code=status.HTTP_201_CREATED
 )
 @limiter.limit("10/minute")
-def create_new_user(
+async def create_new_user(
     request: Request,
     user: pydantic_schemas.UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_admin: pydantic_schemas.User = Depends(auth.get_current_admin_user),
 ):
-    db_user = crud.get_user(db, username=user.username)
+    db_user = await crud.get_user(db, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    db_user_by_email = crud.get_user_by_email(db, email=user.email)
+    db_user_by_email = await crud.get_user_by_email(db, email=user.email)
     if db_user_by_email:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    return crud.create_user(db=db, user=user)
+    return await crud.create_user(db=db, user=user)
 
 
 @admin_router.get("/users", response_model=List[pydantic_schemas.User])
 @limiter.limit("10/minute")
-def read_all_users(
+async def read_all_users(
     request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_admin: pydantic_schemas.User = Depends(auth.get_current_admin_user),
 ):
-    users = crud.get_users(db, skip=skip, limit=limit)
+    users = await crud.get_users(db, skip=skip, limit=limit)
     return users
 
 
 @admin_router.put("/users/{user_id}", response_model=pydantic_schemas.User)
 @limiter.limit("10/minute")
-def update_existing_user(
+async def update_existing_user(
     request: Request,
     user_id: int,
     user_update: pydantic_schemas.UserUpdateAdmin,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_admin: pydantic_schemas.User = Depends(auth.get_current_admin_user),
 ):
-    db_user = crud.update_user(db, user_id=user_id, user_update=user_update)
+    db_user = await crud.update_user(db, user_id=user_id, user_update=user_update)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
@@ -66,28 +68,26 @@ def update_existing_user(
 
 @admin_router.get("/policies", response_model=List[pydantic_schemas.Policy])
 @limiter.limit("10/minute")
-def read_all_policies(
-    request,
-    Request,
+async def read_all_policies(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_admin: pydantic_schemas.User = Depends(auth.get_current_admin_user),
 ):
-    policies = crud.get_policies(db, skip=skip, limit=limit)
+    policies = await crud.get_policies(db, skip=skip, limit=limit)
     return policies
 
 
 @admin_router.get("/policies/{policy_id}", response_model=pydantic_schemas.Policy)
 @limiter.limit("10/minute")
-def read_specific_policy(
-    request,
-    Request,
+async def read_specific_policy(
+    request: Request,
     policy_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_admin: pydantic_schemas.User = Depends(auth.get_current_admin_user),
 ):
-    db_policy = crud.get_policy_by_id(db, policy_id=policy_id)
+    db_policy = await crud.get_policy_by_id(db, policy_id=policy_id)
     if db_policy is None:
         raise HTTPException(status_code=404, detail="Policy not found")
     return db_policy
@@ -95,19 +95,42 @@ def read_specific_policy(
 
 @admin_router.put("/policies/{policy_id}", response_model=pydantic_schemas.Policy)
 @limiter.limit("10/minute")
-def update_existing_policy(
+async def update_existing_policy(
     request: Request,
     policy_id: str,
     policy_update: pydantic_schemas.Policy,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_admin: pydantic_schemas.User = Depends(auth.get_current_admin_user),
 ):
-    db_policy = crud.update_policy(db, policy_id=policy_id, policy_update=policy_update)
+    db_policy = await crud.update_policy(
+        db, policy_id=policy_id, policy_update=policy_update
+    )
     if db_policy is None:
         raise HTTPException(status_code=404, detail="Policy not found")
     return db_policy
 
 
+# --- Profiling Endpoints ---
+
+
+@admin_router.get("/profile/traces")
+@limiter.limit("10/minute")
+async def read_adjudication_traces(
+    request: Request,
+    current_admin: pydantic_schemas.User = Depends(auth.get_current_admin_user),
+):
+    """
+    Per-stage timings of the most recently adjudicated claims, with the p50 and
+    p95 of each stage across them, and the hit rates of this process's rule
+    match and rule application caches.
+    """
+    return {
+        "summary": stage_percentiles(),
+        "cache_hit_rates": cache_hit_rates(),
+        "traces": list(claim_traces),
+    }
+
+
 from datetime import timedelta
 
 from fastapi.security import OAuth2PasswordRequestForm
@@ -123,11 +146,11 @@ token_router = APIRouter()
 @limiter.limit("10/minute")
 async def login_for_access_token(
     request: Request,
-    db: Session = Depends(get_db),  # <-- Add DB session dependency
+    db: AsyncSession = Depends(get_db),  # <-- Add DB session dependency
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
     # Use the auth function to get the user from the real database
-    user = auth.get_user(db, form_data.username)
+    user = await auth.get_user(db, form_data.username)
 
     if not user or not auth.verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
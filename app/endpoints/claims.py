@@ -1,57 +1,97 @@
 # app/endpoints.py
 
+import asyncio
+import base64
+import logging
 from datetime import timedelta
+from uuid import UUID
 
-from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    HTTPException,
+    Request,
+    UploadFile,
+    status,
+)
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from slowapi.errors import RateLimitExceeded
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import auth, crud
+from ..circuit_breaker import CircuitOpenError
 from ..config import settings
-from ..database import get_db
+from ..database import AsyncSessionLocal, get_db
 from ..limiter import limiter  # Import the limiter instance
 from ..pydantic_schemas import (
     AdjudicatedClaim,
+    ClaimIntakeResponse,
     ExtractedData,
-    ExtractedDataWithConfidence,
     InsuranceDetails,
     Token,
     User,
 )
 from ..rules_engine import adjudicate_claim
+from ..rules_utils import run_final_sanity_check
+from ..worker import extract_bill
 
-# from ..value_extractor import extract_data_from_bill
-from ..value_extractor import extract_data_from_bill
-
-# import db
-db = get_db()
-
+logger = logging.getLogger(__name__)
 
 # We use APIRouter to keep endpoint definitions organized
 claims_router = APIRouter()
 
 
-@claims_router.post("/extract", response_model=ExtractedDataWithConfidence)
+@claims_router.post(
+    "/extract",
+    response_model=ClaimIntakeResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
 @limiter.limit("10/minute")
 async def create_extraction_request(
     request: Request,
     file: UploadFile = File(...),
     current_user: User = Depends(auth.get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Receives a PDF medical bill, authenticates the user, applies rate limiting,
-    and calls the AI service to extract structured data.
+    and queues the bill for AI data extraction by the background worker.
+    Poll `GET /claims/{claim_id}/status` for the result.
     """
-    print(
-        f"User '{current_user.username}' initiated an extraction for file: {file.filename}"
+    logger.info(
+        "User '%s' initiated an extraction for file: %s",
+        current_user.username,
+        file.filename,
     )
 
-    # Call the core logic from your value_extractor service
-    extracted_data = await extract_data_from_bill(file)
+    file_content = await file.read()
+    db_claim = await crud.create_extraction_claim(
+        db, user=current_user, filename=file.filename
+    )
 
-    return extracted_data
+    # Hand the heavy PDF rasterization + AI call off to the worker process. The
+    # broker publish blocks (and retries) while Redis is slow, so it runs in a
+    # thread rather than on the event loop.
+    try:
+        await asyncio.to_thread(
+            extract_bill.delay,
+            str(db_claim.claim_id),
+            base64.b64encode(file_content).decode("ascii"),
+        )
+    except Exception:
+        logger.exception("Could not queue claim %s for extraction", db_claim.claim_id)
+        await crud.update_claim_extraction(
+            db, claim_id=db_claim.claim_id, status="failed"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The extraction queue is unavailable, try again shortly.",
+        )
+
+    return ClaimIntakeResponse(claim_id=str(db_claim.claim_id), status=db_claim.status)
 
 
 @claims_router.post("/adjudicate", response_model=AdjudicatedClaim)
@@ -59,49 +99,89 @@ async def create_extraction_request(
 async def create_adjudication_request(
     request: Request,
     extracted_data: ExtractedData,
+    background_tasks: BackgroundTasks,
     insurance_details: InsuranceDetails = Depends(InsuranceDetails),
+    claim_id: UUID | None = None,
     current_user: User = Depends(auth.get_current_user),
-    db: Session = Depends(get_db),  # <-- Add DB session dependency
+    db: AsyncSession = Depends(get_db),  # <-- Add DB session dependency
 ):
     """
     Receives structured bill data and applies the adjudication rules engine.
-    This is the second step in the workflow.
+    This is the second step in the workflow: pass the `claim_id` returned by
+    /extract to complete that claim, or leave it out to record a new one.
     """
-    adjudicated_result = await adjudicate_claim(extracted_data, insurance_details)
-    print("saving the adjudicated claim to the database")
-    db_claim = crud.create_claim_record(
-        db=db,
-        user=current_user,
-        policy_id=insurance_details.policy_number,
-        extracted_data=extracted_data,
-        adjudicated_claim=adjudicated_result,
-    )
+    db_claim = None
+    if claim_id is not None:
+        db_claim = await crud.get_claim_by_id(db, claim_id=claim_id)
+        if db_claim is None:
+            raise HTTPException(status_code=404, detail="Claim not found")
+        if db_claim.submitted_by_user_id != current_user.user_id:
+            raise HTTPException(
+                status_code=403, detail="Not authorized to adjudicate this claim"
+            )
+
+    try:
+        adjudicated_result = await adjudicate_claim(extracted_data, insurance_details)
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
+    logger.debug("Saving the adjudicated claim to the database")
+    if db_claim is not None:
+        db_claim = await crud.complete_claim_record(
+            db=db,
+            db_claim=db_claim,
+            policy_id=insurance_details.policy_number,
+            adjudicated_claim=adjudicated_result,
+        )
+    else:
+        db_claim = await crud.create_claim_record(
+            db=db,
+            user=current_user,
+            policy_id=insurance_details.policy_number,
+            extracted_data=extracted_data,
+            adjudicated_claim=adjudicated_result,
+        )
 
     # --- Step 3: Add the DB-generated claim_id to our response ---
     # This ensures the API response includes the unique ID from the database
-    # adjudicated_result.claim_id = db_claim.claim_id
+    adjudicated_result.claim_id = db_claim.claim_id
+
+    # The sanity check was left for after the response; it is stored on the
+    # claim, where GET /claims/{claim_id} picks it up
+    if adjudicated_result.sanity_check_result is None:
+        background_tasks.add_task(_audit_claim, db_claim.claim_id, adjudicated_result)
 
     # print(f"Successfully saved claim with ID: {db_claim.claim_id}")
     return adjudicated_result
 
 
-from uuid import UUID
-
 from .. import pydantic_schemas as schemas
 
 
+async def _audit_claim(claim_id: UUID, adjudicated_claim: AdjudicatedClaim) -> None:
+    try:
+        sanity_result = await run_final_sanity_check(adjudicated_claim)
+        async with AsyncSessionLocal() as db:
+            await crud.update_claim_sanity_check(
+                db, claim_id=claim_id, sanity_check_result=sanity_result
+            )
+    except Exception:
+        logger.exception("Sanity check failed for claim %s", claim_id)
+
+
 @claims_router.get("/{claim_id}", response_model=schemas.AdjudicatedClaim)
 @limiter.limit("10/minute")
 async def read_claim(
     request: Request,
     claim_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: schemas.User = Depends(auth.get_current_user),
 ):
     """
     Retrieves the full details of a single claim by its ID.
     """
-    db_claim = crud.get_claim_by_id(db, claim_id=claim_id)
+    db_claim = await crud.get_claim_by_id(db, claim_id=claim_id)
     if db_claim is None:
         raise HTTPException(status_code=404, detail="Claim not found")
 
@@ -110,25 +190,59 @@ async def read_claim(
     if db_claim.submitted_by_user_id != current_user.user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view this claim")
 
+    # Claims created by /extract have no adjudication until /adjudicate runs
+    if db_claim.adjudicated_data is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Claim is not adjudicated yet (status: {db_claim.status}). "
+            f"Poll GET /claims/{claim_id}/status for its extraction.",
+        )
+
     return db_claim.adjudicated_data
 
 
+@claims_router.get("/{claim_id}/status", response_model=schemas.ClaimStatusResponse)
+@limiter.limit("60/minute")
+async def read_claim_status(
+    request: Request,
+    claim_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.User = Depends(auth.get_current_user),
+):
+    """
+    Returns the processing status of a claim and, once the background
+    extraction has finished, the extracted data.
+    """
+    db_claim = await crud.get_claim_by_id(db, claim_id=claim_id)
+    if db_claim is None:
+        raise HTTPException(status_code=404, detail="Claim not found")
+
+    if db_claim.submitted_by_user_id != current_user.user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this claim")
+
+    return schemas.ClaimStatusResponse(
+        claim_id=str(db_claim.claim_id),
+        status=db_claim.status,
+        extracted_data=db_claim.extracted_data,
+    )
+
+
 from typing import List
 
 
-@claims_router.get("/")
+@claims_router.get("/", response_model=List[schemas.ClaimRecord])
 @limiter.limit("10/minute")
 async def read_claims(
     request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: schemas.User = Depends(auth.get_current_user),
 ):
     """
     Retrieves a list of claims submitted by the current user.
     """
-    claims = crud.get_claims_by_user(
+    claims = await crud.get_claims_by_user(
         db, user_id=current_user.user_id, skip=skip, limit=limit
     )
     # return the full claim objects
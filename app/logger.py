@@ -0,0 +1,41 @@
+# app/logger.py
+
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FILE = "app.log"
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listener: QueueListener | None = None
+
+
+def setup_logging(level: int = logging.INFO) -> QueueListener:
+    """
+    Configures the root logger to hand records to a queue. The file and stderr
+    writes happen on a background QueueListener thread, so a log call on the
+    request path only enqueues the record and returns. Safe to call more than
+    once; only the first call installs the handlers.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    file_handler = logging.FileHandler(LOG_FILE)
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(-1)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.addHandler(QueueHandler(log_queue))
+
+    _listener = QueueListener(log_queue, file_handler, stream_handler)
+    _listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(_listener.stop)
+    return _listener
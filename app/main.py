@@ -1,5 +1,8 @@
 # app/main.py
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.requests import Request
 from fastapi.responses import JSONResponse
@@ -10,11 +13,29 @@ from .config import settings
 from .endpoints.admin import admin_router, token_router
 from .endpoints.claims import claims_router
 from .limiter import limiter
+from .logger import setup_logging
+from .normalization_service import get_normalization_service
+
+setup_logging()
+
+
+def _warm_normalization_service():
+    get_normalization_service().warm_up()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model and index before serving, instead of on the
+    # first adjudication request
+    await asyncio.to_thread(_warm_normalization_service)
+    yield
+
 
 app = FastAPI(
     title="Mediclaim Processing API",
     description="API for extracting and adjudicating medical claims.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -52,4 +73,9 @@ app.include_router(admin_router, prefix="/api/v1/admin", tags=["Admin"])
 @limiter.limit("5/minute")  # Protect the health check endpoint as well
 def read_root(request: Request):
     """just for test"""
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+# Build the OpenAPI schema once at import. FastAPI caches it on the app, so the
+# first /docs or /openapi.json request no longer pays for generating it.
+app.openapi()
@@ -1,19 +1,18 @@
 # app/normalization_service.py
 
-import os
+import functools
+import logging
 import pickle
-import sys
+from collections import OrderedDict
 
 import faiss
 import numpy as np
-
-# Add the root project directory to the Python path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-
 from sentence_transformers import SentenceTransformer
 
 from app.data.master_data import MASTER_ITEM_LIST
 
+logger = logging.getLogger(__name__)
+
 # --- Configuration ---
 MODEL_NAME = "all-MiniLM-L6-v2"
 INDEX_PATH = "app/data/medical_items.index"
@@ -21,6 +20,11 @@ ID_MAP_PATH = "app/data/master_item_ids.pkl"
 SIMILARITY_THRESHOLD = (
     0.5  # Similarity score must be above this to be considered a match
 )
+# Bills repeat the same descriptions across claims, so lookups are memoized
+DESCRIPTION_CACHE_SIZE = 100_000
+# Embeddings are shared by Step 1 and the rule-match cache, so one claim
+# encodes each description once (about 1.5 KB per entry)
+EMBEDDING_CACHE_SIZE = 10_000
 
 
 class NormalizationService:
@@ -29,7 +33,7 @@ class NormalizationService:
     """
 
     def __init__(self):
-        print("Initializing Normalization Service...")
+        logger.info("Initializing Normalization Service...")
         try:
             self.model = SentenceTransformer(MODEL_NAME)
             self.index = faiss.read_index(INDEX_PATH)
@@ -39,12 +43,23 @@ class NormalizationService:
 
             # Create a fast lookup dictionary from the master list
             self.master_data_map = {item["id"]: item for item in MASTER_ITEM_LIST}
-            print("✅ Normalization Service loaded successfully.")
+            # IDs of the master items that IRDAI lists as non-payable
+            self.non_payable_ids = frozenset(
+                item["id"]
+                for item in MASTER_ITEM_LIST
+                if item["category"] == "Non-Payable Item"
+            )
+
+            # Description -> match, most recently used last
+            self._matches: OrderedDict[str, dict | None] = OrderedDict()
+            # Description -> unit-length embedding, most recently used last
+            self._vectors: OrderedDict[str, np.ndarray] = OrderedDict()
+            logger.info("✅ Normalization Service loaded successfully.")
 
         except FileNotFoundError:
-            print("\n❌ ERROR: Index files not found.")
-            print(
-                "Please run the 'scripts/build_vector_db.py' script first to create the index."
+            logger.error(
+                "❌ Index files not found. Please run the "
+                "'scripts/build_vector_db.py' script first to create the index."
             )
             raise
 
@@ -58,17 +73,69 @@ class NormalizationService:
         Returns:
             The full master item dictionary if a confident match is found, otherwise None.
         """
-        # 1. Encode the input description into a query vector
-        query_vector = self.model.encode([description], convert_to_numpy=True)
-        faiss.normalize_L2(query_vector)
+        return self.normalize_descriptions([description])[0]
 
-        # 2. Search the FAISS index for the single closest match (k=1)
-        # The 'distances' are cosine similarities, 'indices' are the positions
-        distances, indices = self.index.search(query_vector, k=1)
+    def normalize_descriptions(self, descriptions: list[str]) -> list[dict | None]:
+        """
+        Batch version of `normalize_description`: every description not seen
+        before is encoded in one model call and searched in one index query.
 
-        best_match_index = indices[0][0]
-        best_match_similarity = distances[0][0]
+        Returns:
+            One master item dictionary (or None) per input description, in order.
+        """
+        results = {}
+        for description in dict.fromkeys(descriptions):
+            if description in self._matches:
+                self._matches.move_to_end(description)
+                results[description] = self._matches[description]
+        pending = [d for d in dict.fromkeys(descriptions) if d not in results]
+
+        if pending:
+            # 1. Encode the input descriptions into query vectors
+            query_vectors = self.embed_descriptions(pending)
+
+            # 2. Search the FAISS index for the single closest match (k=1)
+            # The 'distances' are cosine similarities, 'indices' are the positions
+            distances, indices = self.index.search(query_vectors, k=1)
+
+            for description, (similarity,), (index,) in zip(
+                pending, distances, indices
+            ):
+                results[description] = self._best_match(description, similarity, index)
+                self._matches[description] = results[description]
+            while len(self._matches) > DESCRIPTION_CACHE_SIZE:
+                self._matches.popitem(last=False)
+
+        return [results[description] for description in descriptions]
+
+    def embed_descriptions(self, descriptions: list[str]) -> np.ndarray:
+        """
+        Encodes descriptions into unit-length float32 vectors, one row each, so
+        a dot product between two rows is their cosine similarity. Recently
+        encoded descriptions are reused, the rest are encoded in one batch.
+        """
+        pending = [d for d in dict.fromkeys(descriptions) if d not in self._vectors]
+        if pending:
+            vectors = self.model.encode(pending, convert_to_numpy=True)
+            faiss.normalize_L2(vectors)
+            self._vectors.update(zip(pending, vectors))
+        for description in descriptions:
+            self._vectors.move_to_end(description)
+        embeddings = np.stack([self._vectors[d] for d in descriptions])
+        while len(self._vectors) > EMBEDDING_CACHE_SIZE:
+            self._vectors.popitem(last=False)
+        return embeddings
+
+    def warm_up(self) -> None:
+        """
+        Runs one throwaway encode and search, outside the description cache, so
+        the first real claim doesn't pay for the model's lazy initialization.
+        """
+        self.index.search(self.embed_descriptions(["warm up"]), k=1)
 
+    def _best_match(
+        self, description: str, best_match_similarity: float, best_match_index: int
+    ) -> dict | None:
         # 3. Check if the match is good enough
         if best_match_similarity >= SIMILARITY_THRESHOLD:
             # 4. Translate the index position back to our canonical ID
@@ -78,10 +145,20 @@ class NormalizationService:
             return self.master_data_map.get(matched_id)
         else:
             # The best match was not similar enough, so we can't be confident.
-            print(
-                f"No confident match for '{description}'. Best similarity: {best_match_similarity:.2f} of '{self.id_map[best_match_index]}'"
+            logger.info(
+                "No confident match for '%s'. Best similarity: %.2f of '%s'",
+                description,
+                best_match_similarity,
+                self.id_map[best_match_index],
             )
             return None
 
 
 # We can create a single instance to be used throughout the app
+@functools.lru_cache(maxsize=None)
+def get_normalization_service() -> NormalizationService:
+    """
+    Returns the process-wide service, loading the model and index on first use,
+    so its description cache stays warm across claims.
+    """
+    return NormalizationService()
@@ -0,0 +1,68 @@
+# app/profiling.py
+
+import logging
+import math
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Stage timings of the most recently adjudicated claims, newest last
+claim_traces: deque[dict] = deque(maxlen=settings.PROFILE_TRACE_BUFFER)
+
+
+class ClaimTrace:
+    """
+    Times the stages of one claim's adjudication. Each `lap(stage)` records the
+    time since the previous lap (or since the trace started) under that stage.
+    """
+
+    def __init__(self, policy_number: str):
+        self.policy_number = policy_number
+        self.started_at = datetime.now(timezone.utc)
+        self.stages: dict[str, float] = {}
+        self._started_ns = self._last_lap_ns = time.perf_counter_ns()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter_ns()
+        self.stages[stage] = (now - self._last_lap_ns) / 1e6
+        self._last_lap_ns = now
+
+    def record(self) -> None:
+        """Adds the finished trace to `claim_traces`."""
+        trace = {
+            "started_at": self.started_at.isoformat(),
+            "policy_number": self.policy_number,
+            "total_ms": (time.perf_counter_ns() - self._started_ns) / 1e6,
+            "stages_ms": self.stages,
+        }
+        claim_traces.append(trace)
+        logger.info("Adjudication stage timings: %s", trace)
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def stage_percentiles() -> dict[str, dict[str, float]]:
+    """The p50 and p95 of each stage, and of the total, over `claim_traces`."""
+    durations: dict[str, list[float]] = {}
+    for trace in claim_traces:
+        for stage, ms in trace["stages_ms"].items():
+            durations.setdefault(stage, []).append(ms)
+        durations.setdefault("total", []).append(trace["total_ms"])
+
+    percentiles = {}
+    for stage, values in durations.items():
+        values.sort()
+        percentiles[stage] = {
+            "count": len(values),
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+        }
+    return percentiles
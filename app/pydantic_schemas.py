@@ -1,13 +1,24 @@
 # app/schemas.py
 
-from datetime import date
-from typing import List, Optional, Union
+import sys
+from datetime import date, datetime
+from typing import Annotated, List, Literal, Union
+from uuid import UUID
 
-from pydantic import BaseModel, Field, conint
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, TypeAdapter
+from pydantic.dataclasses import dataclass
 
 # Note: In a production financial system, using Decimal type is preferred
 # for monetary values to avoid floating-point inaccuracies.
-# For this version, we will use float for simplicity.
+# For this version, we will use float for simplicity, rounded to whole paise
+# on validation so float noise from the extractor or the LLM agent doesn't
+# creep into the totals.
+Amount = Annotated[float, AfterValidator(lambda v: round(v, 2))]
+
+# Hospital names and policy identifiers repeat across many claims (same
+# hospital, same insurer), so they are interned to share one string object per
+# value.
+InternedStr = Annotated[str, AfterValidator(sys.intern)]
 
 
 class LineItem(BaseModel):
@@ -17,48 +28,58 @@ class LineItem(BaseModel):
 
     description: str = Field(..., description="Description of the service or item.")
     quantity: float = Field(..., gt=0, description="Quantity of the item/service.")
-    unit_price: float = Field(
+    unit_price: Amount = Field(
         ..., ge=0, description="Price per unit of the item/service."
     )
-    total_amount: float = Field(..., ge=0, description="Total cost for this line item.")
+    total_amount: Amount = Field(
+        ..., ge=0, description="Total cost for this line item."
+    )
 
 
-class InsuranceDetails(BaseModel):
+@dataclass(slots=True, frozen=True)
+class InsuranceDetails:
     """
     Represents the insurance details associated with the claim.
     """
 
-    policy_number: str = Field(..., description="Insurance policy number.")
-    insurance_provider: str = Field(..., description="Name of the insurance provider.")
+    policy_number: InternedStr = Field(..., description="Insurance policy number.")
+    insurance_provider: InternedStr = Field(
+        ..., description="Name of the insurance provider."
+    )
 
 
-class ExtractedData(BaseModel):
+class BillHeader(BaseModel):
     """
-    Represents the structured data extracted from a medical bill by the AI model.
+    Header fields shared by the extracted bill and the adjudicated claim.
     """
 
-    # Header Information
-    hospital_name: str = Field(..., description="Name of the hospital.")
+    hospital_name: InternedStr = Field(..., description="Name of the hospital.")
+    # Not interned: interned strings outlive the claim, and this is personal data
     patient_name: str = Field(..., description="Name of the patient.")
-    bill_no: Optional[str] = Field(
-        None, description="The unique bill or invoice number."
-    )
+    bill_no: str | None = Field(None, description="The unique bill or invoice number.")
     bill_date: date = Field(..., description="Date the bill was issued.")
     admission_date: date = Field(..., description="Date of patient admission.")
-    discharge_date: Optional[date] = Field(
+    discharge_date: date | None = Field(
         None, description="Date of patient discharge (if present)."
     )
 
+
+class ExtractedData(BillHeader):
+    """
+    Represents the structured data extracted from a medical bill by the AI model.
+    """
+
     # Itemized Charges
     line_items: List[LineItem] = Field(..., description="List of all itemized charges.")
 
     # Total Amounts
-    net_payable_amount: float = Field(
+    net_payable_amount: Amount = Field(
         ..., description="The final amount payable on the bill."
     )
 
 
-class ClaimIntakeResponse(BaseModel):
+@dataclass(slots=True)
+class ClaimIntakeResponse:
     """
     The immediate response sent back to the user after submitting a claim.
     """
@@ -77,15 +98,21 @@ class AdjudicatedLineItem(LineItem):
     status: str = Field(
         "Allowed", description="Status after adjudication (e.g., Allowed, Disallowed)."
     )
-    allowed_amount: float = Field(
+    allowed_amount: Amount = Field(
         ..., ge=0, description="The final amount allowed for this item."
     )
-    disallowed_amount: float = Field(
+    disallowed_amount: Amount = Field(
         ..., ge=0, description="The amount disallowed for this item."
     )
-    reason: Optional[str] = Field(
-        None, description="Reason for any adjustment or denial."
-    )
+    reason: str | None = Field(None, description="Reason for any adjustment or denial.")
+
+    @classmethod
+    def from_trusted(cls, data: dict) -> "AdjudicatedLineItem":
+        """
+        Builds an item from already-validated data without re-running validation.
+        Only for internal handoffs; API input must go through normal validation.
+        """
+        return cls.model_construct(**data)
 
 
 # --- NEW: Schema for the AI Auditor's response ---
@@ -110,54 +137,48 @@ class SanityCheckResult(BaseModel):
     )
 
 
-class AdjudicatedClaim(BaseModel):
+class AdjudicatedClaim(BillHeader):
     """
     The final response object containing the complete adjudication result.
     """
 
-    hospital_name: str = Field(..., description="Name of the hospital.")
-    patient_name: str = Field(..., description="Name of the patient.")
-    bill_no: Optional[str] = Field(
-        None, description="The unique bill or invoice number."
-    )
-    bill_date: date = Field(..., description="Date the bill was issued.")
-    admission_date: date = Field(..., description="Date of patient admission.")
-    discharge_date: Optional[date] = Field(
-        None, description="Date of patient discharge (if present)."
-    )
-
     adjudicated_line_items: List[AdjudicatedLineItem] = Field(
         ..., description="The list of line items after adjudication."
     )
 
     # Final Calculated Totals
-    total_claimed_amount: float = Field(
+    total_claimed_amount: Amount = Field(
         ..., description="The gross amount originally claimed."
     )
-    total_amount_reimbursed: float = Field(
+    total_amount_reimbursed: Amount = Field(
         ..., description="The total amount that can be reimbursed."
     )
     adjustments_log: list[str] = Field(
         ..., description="The adjustment made on the bill due to policy rules"
     )
     # --- ADD THIS NEW FIELD ---
-    sanity_check_result: Optional[SanityCheckResult] = Field(
-        None, description="The result from the final AI-powered sanity check."
+    sanity_check_result: SanityCheckResult | None = Field(
+        None,
+        description="The result from the final AI-powered sanity check. Empty while the check is still running in the background.",
+    )
+    claim_id: UUID | None = Field(
+        None, description="The ID of the stored claim, for fetching it later."
     )
 
-    class Config:
-        from_attributes = True
-
-
-# app/schemas.py
-
+    @classmethod
+    def from_trusted(cls, data: dict) -> "AdjudicatedClaim":
+        """
+        Builds a claim from already-validated data without re-running validation.
+        Only for internal handoffs; API input must go through normal validation.
+        """
+        return cls.model_construct(**data)
 
-# (Keep all your existing models)
-# ...
+    model_config = ConfigDict(from_attributes=True)
 
 
 # --- NEW AUTHENTICATION MODELS ---
-class Token(BaseModel):
+@dataclass(slots=True, frozen=True)
+class Token:
     """
     Schema for returning an access token after user authentication.
     """
@@ -166,51 +187,60 @@ class Token(BaseModel):
     token_type: str
 
 
-class TokenData(BaseModel):
+@dataclass(slots=True, frozen=True)
+class TokenData:
     """
     Data contained in the JWT token payload.
     """
 
-    username: Optional[str] = None
+    username: str | None = None
 
 
-class User(BaseModel):
-    """
-    Schema for returning a user from the API. Excludes the password.
-    """
+class UserBase(BaseModel):
+    "class representing the base user schema."
 
     username: str
-    email: Optional[str] = None
-    full_name: Optional[str] = None
-    disabled: Optional[bool] = None
+    email: str | None = None
+    full_name: str | None = None
 
 
-class UserInDB(User):
+class User(UserBase):
     """
-    Represents a user in the database, including hashed password.
+    Schema for returning a user from the API. Excludes the password.
     """
 
-    hashed_password: str
+    disabled: bool | None = None
 
 
 # --- Reusable Models for Confidence Scoring ---
-class FieldWithConfidence(BaseModel):
+# A single constrained type shared by every confidence score, so the bounds
+# are declared (and their validator built) in one place.
+Confidence = Annotated[float, Field(ge=0.0, le=1.0)]
+
+
+# These are built once per extracted field (7 header fields + 4 per line item),
+# so they are slotted dataclasses rather than BaseModels: no per-instance
+# __dict__, and attribute reads go through slot descriptors.
+@dataclass(slots=True)
+class FieldWithConfidence:
     """
     A generic field wrapper that includes the extracted value and the AI's confidence score.
     """
 
-    value: Union[str, float, int, date, None] = Field(
+    # Untagged because the LLM output carries no type tag. Smart-mode union
+    # validation returns on the first exact type match, so members are ordered
+    # by how often they occur: each line item has three numbers to one string.
+    value: Union[float, int, str, date, None] = Field(
         ..., description="The actual extracted value."
     )
-    confidence: float = Field(
+    confidence: Confidence = Field(
         ...,
-        ge=0.0,
-        le=1.0,
         description="The AI's confidence in the accuracy of the value, from 0.0 to 1.0.",
     )
 
 
-class LineItemWithConfidence(BaseModel):
+@dataclass(slots=True)
+class LineItemWithConfidence:
     """
     Represents a single itemized line on the hospital bill with confidence scores."""
 
@@ -236,33 +266,75 @@ class ExtractedDataWithConfidence(BaseModel):
     line_items: List[LineItemWithConfidence]
 
 
+class ClaimStatusResponse(BaseModel):
+    """
+    Response for polling a queued extraction. `extracted_data` is populated
+    once the background worker has finished processing the bill.
+    """
+
+    claim_id: str = Field(..., description="The unique ID of the claim.")
+    status: str = Field(
+        ...,
+        description="Processing status (queued, processing, extracted, failed, completed).",
+    )
+    extracted_data: ExtractedDataWithConfidence | None = Field(
+        None, description="The extracted bill data, once available."
+    )
+
+
+class ClaimRecord(BaseModel):
+    """
+    Schema for returning a stored claim row, as listed for its submitter.
+    """
+
+    claim_id: UUID
+    submitted_by_user_id: int | None = None
+    policy_id: str | None = None
+    status: str | None = None
+    original_pdf_filename: str | None = None
+    extracted_data: dict | None = None
+    adjudicated_data: dict | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+
+    # Allows creating Pydantic model from ORM model
+    model_config = ConfigDict(from_attributes=True)
+
+
 class PolicyRuleMatch(BaseModel):
     """
     Defines the expected JSON structure from the LLM for rule matching.
     """
 
-    applicable_rule_name: Optional[str] = Field(
+    applicable_rule_name: str | None = Field(
         None,
         description="The name of the best matching sub-limit rules, or null if none apply.",
     )
 
 
-class UserUpdateAdmin(BaseModel):
-    """Schema for updating a user's details from the admin panel."""
+class NumberedRuleMatch(PolicyRuleMatch):
+    """The rule match for one item of a numbered list of bill items."""
 
-    full_name: Optional[str] = None
-    email: Optional[str] = None
-    role_id: Optional[int] = None
-    is_active: Optional[bool] = None
-    password: Optional[str] = None  # Admin can reset a password
+    item_number: int = Field(..., description="The number of the item in the list.")
 
 
-class UserBase(BaseModel):
-    "class representing the base user schema."
+class PolicyRuleMatchBatch(BaseModel):
+    """
+    Defines the expected JSON structure from the LLM for matching several
+    items at once.
+    """
 
-    username: str
-    email: Optional[str] = None
-    full_name: Optional[str] = None
+    matches: List[NumberedRuleMatch]
+
+
+class UserUpdateAdmin(BaseModel):
+    """Schema for updating a user's details from the admin panel."""
+
+    full_name: str | None = None
+    email: str | None = None
+    role_id: int | None = None
+    is_active: bool | None = None
+    password: str | None = None  # Admin can reset a password
 
 
 class UserCreate(UserBase):
@@ -271,26 +343,11 @@ class UserCreate(UserBase):
     """
 
     password: str
-    role_id: conint(ge=1, le=2) = Field(
+    role_id: Literal[1, 2] = Field(
         ..., description="Role ID: 1 for admin, 2 for regular user."
     )
 
 
-# You can also update your existing User schema to inherit from UserBase
-# for consistency, though it's not required to fix the error.
-# class User(UserBase):
-#     """
-#     Schema for returning a user from the API. Excludes the password.
-#     """
-
-#     user_id: int
-#     is_active: bool
-#     role_id: int
-
-#     class Config:
-#         from_attributes = True  # Allows creating Pydantic model from ORM model
-
-
 class Policy(BaseModel):
     """
     Schema for representing a policy rulebook.
@@ -300,5 +357,11 @@ class Policy(BaseModel):
     policy_name: str
     rules: dict  # The entire rules JSON object
 
-    class Config:
-        from_attributes = True  # Allows creating Pydantic model from ORM model
+    # Allows creating Pydantic model from ORM model
+    model_config = ConfigDict(from_attributes=True)
+
+
+# --- Cached validators ---
+# Built once at import so hot paths reuse the compiled validator instead of
+# going through the model constructor with an intermediate dict.
+EXTRACTED_DATA_WITH_CONFIDENCE_ADAPTER = TypeAdapter(ExtractedDataWithConfidence)
@@ -0,0 +1,104 @@
+# app/rule_calculator.py
+
+import math
+
+from app.pydantic_schemas import AdjudicatedLineItem
+
+# Rules whose limit is a plain amount, per unit billed or for the whole claim,
+# are computed directly; only the rest (e.g. a percentage of another item's
+# cost, or delivery-type packages) need the agent.
+_PER_UNIT = frozenset({"day", "session", "eye", "joint", "unit", "instance"})
+_PER_CLAIM = frozenset({None, "claim", "hospitalization", "year"})
+
+
+def _rule_limit(policy_rule: dict, sum_insured: float):
+    """
+    The rule's limit and what it is per (e.g. "day", or None for the whole
+    claim), or None if it needs the agent.
+    """
+    rule_type = policy_rule.get("type")
+    per = policy_rule.get("per")
+    value = policy_rule.get("value")
+    if value is None or (per not in _PER_UNIT and per not in _PER_CLAIM):
+        return None
+
+    if rule_type in ("fixed", "fixed_package"):
+        limit = value
+    elif rule_type == "percentage_of_sum_insured":
+        limit = value / 100 * sum_insured
+        if "max_cap_per_day" in policy_rule:
+            # e.g. room rent at 1% of sum insured per day, up to a daily cap
+            limit = min(limit, policy_rule["max_cap_per_day"])
+            per = "day"
+    else:
+        return None
+    return limit, per if per in _PER_UNIT else None
+
+
+def can_apply_deterministically(policy_rule: dict) -> bool:
+    """True for rules `apply_policy_rule_to_rows` computes without the LLM."""
+    return _rule_limit(policy_rule, sum_insured=0.0) is not None
+
+
+def _cap(
+    item: AdjudicatedLineItem, limit: float, policy_rule: dict
+) -> AdjudicatedLineItem:
+    allowed_amount = round(float(min(limit, item.total_amount)), 2)
+    disallowed_amount = round(item.total_amount - allowed_amount, 2)
+    if disallowed_amount <= 0:
+        return item.model_copy()
+    return item.model_copy(
+        update={
+            "status": "Allowed" if allowed_amount > 0 else "Disallowed",
+            "allowed_amount": allowed_amount,
+            "disallowed_amount": disallowed_amount,
+            "reason": f"Capped at ₹{limit:,.2f} as per policy rule: {policy_rule.get('description', policy_rule)}",
+        }
+    )
+
+
+def apply_policy_rule_to_rows(
+    items: list[AdjudicatedLineItem], policy_rule: dict, sum_insured: float
+) -> list[AdjudicatedLineItem] | None:
+    """
+    Applies a simple sub-limit rule without the LLM to every bill row it
+    matched, in bill order. A limit per unit (day, session, ...) applies to each
+    row's own quantity, while a limit for the claim, `max_cap` and
+    `max_sessions` are shared by all the rows, so two Ambulance rows get one
+    Ambulance limit between them. Returns None for rules it can't compute, so
+    the caller falls back to the agent.
+    """
+    rule_limit = _rule_limit(policy_rule, sum_insured)
+    if rule_limit is None:
+        return None
+    limit, per = rule_limit
+
+    remaining = policy_rule.get("max_cap", math.inf)
+    if per is None:
+        remaining = min(remaining, limit)
+    sessions_left = policy_rule.get("max_sessions") if per == "session" else None
+
+    adjudicated_items = []
+    for item in items:
+        row_limit = remaining
+        if per is not None:
+            units = item.quantity
+            if sessions_left is not None:
+                units = min(units, sessions_left)
+                sessions_left -= units
+            row_limit = min(row_limit, limit * units)
+        adjudicated_item = _cap(item, row_limit, policy_rule)
+        remaining = max(remaining - adjudicated_item.allowed_amount, 0)
+        adjudicated_items.append(adjudicated_item)
+    return adjudicated_items
+
+
+def apply_policy_rule_deterministically(
+    item: AdjudicatedLineItem, policy_rule: dict, sum_insured: float
+) -> AdjudicatedLineItem | None:
+    """
+    Applies a simple sub-limit rule to a single row without the LLM. Returns
+    None for rules it can't compute.
+    """
+    adjudicated_items = apply_policy_rule_to_rows([item], policy_rule, sum_insured)
+    return adjudicated_items[0] if adjudicated_items else None
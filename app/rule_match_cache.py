@@ -0,0 +1,309 @@
+# app/rule_match_cache.py
+
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+from collections import Counter, OrderedDict
+from collections.abc import Callable
+
+import numpy as np
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.pydantic_schemas import AdjudicatedLineItem
+
+logger = logging.getLogger(__name__)
+
+# Sentinel for a cache miss, since None is a valid cached answer ("no rule applies")
+_MISS = object()
+
+
+def _identity(value):
+    return value
+
+
+# Lookups since the process started, per kind of result ("Rule match", "Rule
+# application"), counted by outcome: "cache_hit", "store_hit", "joined" (shared
+# an in-flight call) or "miss" (made the call)
+lookup_counts: dict[str, Counter] = {}
+
+
+def cache_hit_rates() -> dict[str, dict]:
+    """
+    The lookup counts of each kind of result, with the share of lookups that
+    were answered without making the call.
+    """
+    rates = {}
+    for kind, counts in lookup_counts.items():
+        total = counts.total()
+        rates[kind] = {
+            **counts,
+            "hit_rate": 1 - counts["miss"] / total if total else None,
+        }
+    return rates
+
+
+def normalize_description(description: str) -> str:
+    """Case- and whitespace-insensitive form of a bill item description."""
+    return " ".join(description.casefold().split())
+
+
+def sub_limits_signature(sub_limits: dict) -> str:
+    """A stable hash of a policy's sub-limit rules."""
+    payload = json.dumps(sub_limits, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def rule_match_key(description: str, sub_limits_sha: str) -> str:
+    """
+    Cache key for matching one description against one set of sub-limits,
+    given their `sub_limits_signature`.
+    """
+    payload = f"{normalize_description(description)}\x00{sub_limits_sha}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def rule_application_key(
+    item: AdjudicatedLineItem, policy_rule: dict, sum_insured: float
+) -> str:
+    """Cache key for applying one policy rule to one line item."""
+    payload = json.dumps(
+        [item.model_dump(mode="json"), policy_rule, sum_insured],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RuleMatchCache:
+    """
+    A bounded, in-process LRU cache of LLM rule results (matched rule names or
+    adjudicated line items), keyed by a hash of their inputs.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, object] = OrderedDict()
+
+    def get(self, key: str):
+        """Returns the cached result (possibly None), or _MISS."""
+        result = self._entries.get(key, _MISS)
+        if result is not _MISS:
+            self._entries.move_to_end(key)
+        return result
+
+    def set(self, key: str, result) -> None:
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class _EmbeddingRing:
+    """
+    Unit-length embeddings and their rule names, at most `maxsize` of them,
+    with each new entry overwriting the oldest once full. The buffer starts
+    small and doubles as entries arrive, so rarely seen policies stay cheap.
+    """
+
+    def __init__(self, dim: int, maxsize: int):
+        self.maxsize = maxsize
+        self.matrix = np.empty((min(maxsize, 64), dim), dtype=np.float32)
+        self.rule_names: list[str | None] = []
+        self.next_row = 0
+
+    def add(self, vector: np.ndarray, rule_name: str | None) -> None:
+        row = self.next_row
+        if row == len(self.rule_names):
+            # Not full yet
+            if row == len(self.matrix):
+                grown = np.empty(
+                    (min(2 * row, self.maxsize), self.matrix.shape[1]),
+                    dtype=np.float32,
+                )
+                grown[:row] = self.matrix
+                self.matrix = grown
+            self.rule_names.append(rule_name)
+        else:
+            self.rule_names[row] = rule_name
+        self.matrix[row] = vector
+        self.next_row = (row + 1) % self.maxsize
+
+
+class SemanticRuleMatchCache:
+    """
+    Rule-match results looked up by embedding similarity instead of exact text,
+    so near-identical descriptions ("Pvt A/C Room Rent", "Private AC Room
+    Rent") reuse an earlier answer. Entries are kept per sub-limits signature,
+    and the oldest are dropped once a signature holds `maxsize` of them.
+    """
+
+    def __init__(self, threshold: float, maxsize: int):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self._entries: dict[str, _EmbeddingRing] = {}
+
+    def lookup(self, signature: str, vectors: np.ndarray) -> dict[int, str | None]:
+        """
+        Returns the cached rule name (possibly None) for each row of `vectors`
+        that is similar enough to an entry, keyed by row number.
+        """
+        ring = self._entries.get(signature)
+        if ring is None:
+            return {}
+        filled = len(ring.rule_names)
+        similarities = vectors @ ring.matrix[:filled].T
+        best = similarities.argmax(axis=1)
+        return {
+            row: ring.rule_names[column]
+            for row, column in enumerate(best)
+            if similarities[row, column] >= self.threshold
+        }
+
+    def add(self, signature: str, vector: np.ndarray, rule_name: str | None) -> None:
+        ring = self._entries.get(signature)
+        if ring is None:
+            ring = self._entries[signature] = _EmbeddingRing(
+                vector.shape[-1], self.maxsize
+            )
+        ring.add(vector, rule_name)
+
+
+class RedisRuleMatchStore:
+    """
+    LLM rule results (JSON-serializable) kept in Redis under `prefix`, so they
+    survive restarts and are shared by every API process. Redis being
+    unavailable only costs the lookup: errors are logged and treated as a miss.
+    """
+
+    def __init__(self, client: Redis, ttl_seconds: int, prefix: str = "rule_match"):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    async def get(self, key: str):
+        """Returns the stored result (possibly None), or _MISS."""
+        try:
+            value = await self.client.get(f"{self.prefix}:{key}")
+        except RedisError as e:
+            logger.warning("Rule result store unavailable: %s", e)
+            return _MISS
+        return _MISS if value is None else json.loads(value)
+
+    async def set(self, key: str, result) -> None:
+        try:
+            await self.client.set(
+                f"{self.prefix}:{key}", json.dumps(result), ex=self.ttl_seconds
+            )
+        except RedisError as e:
+            logger.warning("Rule result store unavailable: %s", e)
+
+
+def _single_flight_cached(
+    cache: RuleMatchCache,
+    store: RedisRuleMatchStore | None,
+    kind: str,
+    key: Callable[..., str],
+    describe: Callable[..., str],
+    to_stored: Callable = _identity,
+    from_stored: Callable = _identity,
+    copy: Callable = _identity,
+):
+    """
+    Decorates an async function so a call with the same `key(*args)` as an
+    earlier one is answered from `cache`, then from `store`, and concurrent
+    callers with the same key share a single call. Results go to the store
+    through `to_stored` and come back through `from_stored`; every caller gets
+    its own `copy` of a result. `kind` and `describe(*args)` label the logs.
+    """
+
+    def decorator(func):
+        # Key -> the call currently answering it
+        in_flight: dict[str, asyncio.Task] = {}
+        counts = lookup_counts.setdefault(kind, Counter())
+
+        async def look_up(result_key: str, args: tuple):
+            if store is not None:
+                stored = await store.get(result_key)
+                if stored is not _MISS:
+                    logger.debug("%s store hit for '%s'", kind, describe(*args))
+                    counts["store_hit"] += 1
+                    return from_stored(stored)
+            counts["miss"] += 1
+            result = await func(*args)
+            if store is not None:
+                await store.set(result_key, to_stored(result))
+            return result
+
+        def settle(result_key: str, task: asyncio.Task) -> None:
+            del in_flight[result_key]
+            if not task.cancelled() and task.exception() is None:
+                cache.set(result_key, copy(task.result()))
+
+        @functools.wraps(func)
+        async def wrapper(*args):
+            result_key = key(*args)
+            result = cache.get(result_key)
+            if result is not _MISS:
+                logger.debug("%s cache hit for '%s'", kind, describe(*args))
+                counts["cache_hit"] += 1
+                return copy(result)
+
+            task = in_flight.get(result_key)
+            if task is None:
+                task = asyncio.ensure_future(look_up(result_key, args))
+                in_flight[result_key] = task
+                task.add_done_callback(functools.partial(settle, result_key))
+            else:
+                logger.debug(
+                    "Joining in-flight %s for '%s'", kind.lower(), describe(*args)
+                )
+                counts["joined"] += 1
+            # Shielded, so one caller being cancelled doesn't cancel the others
+            return copy(await asyncio.shield(task))
+
+        return wrapper
+
+    return decorator
+
+
+def cached_rule_match(cache: RuleMatchCache, store: RedisRuleMatchStore | None = None):
+    """
+    Decorates an async `(item_description, policy) -> rule name` matcher, where
+    `policy` is a PolicyContext, so repeated descriptions under the same
+    sub-limits are answered from `cache`, then from `store`, and concurrent
+    callers asking the same question (e.g. two claims being adjudicated at
+    once) share a single call.
+    """
+    return _single_flight_cached(
+        cache,
+        store,
+        kind="Rule match",
+        key=lambda item_description, policy: rule_match_key(
+            item_description, policy.sub_limits_sha
+        ),
+        describe=lambda item_description, policy: item_description,
+    )
+
+
+def cached_rule_application(
+    cache: RuleMatchCache, store: RedisRuleMatchStore | None = None
+):
+    """
+    Decorates an async `(item, policy_rule, sum_insured) -> adjudicated item`
+    rule applier so a line item already adjudicated under the same rule and
+    sum insured is answered from `cache`, then from `store`, and concurrent
+    callers applying the same rule to the same item share a single call.
+    """
+    return _single_flight_cached(
+        cache,
+        store,
+        kind="Rule application",
+        key=rule_application_key,
+        describe=lambda item, policy_rule, sum_insured: item.description,
+        to_stored=lambda item: item.model_dump(mode="json"),
+        from_stored=AdjudicatedLineItem.model_validate,
+        copy=AdjudicatedLineItem.model_copy,
+    )
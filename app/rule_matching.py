@@ -0,0 +1,118 @@
+# app/rule_matching.py
+
+import re
+
+import numpy as np
+
+from app.config import settings
+from app.data.master_data import MASTER_ITEM_LIST
+
+# --- Local pre-filter for rule matching ---
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    {"and", "the", "for", "per", "with", "from", "are", "all", "any", "not", "its"}
+)
+# Medicines are billed by brand name, which no rule text mentions, so the usual
+# bill abbreviations and a dosage (e.g. "500mg", "1 g") also count as a hint,
+# as does a name followed by a bare strength (e.g. "Dolo 650", "Pantop-40").
+_MEDICINE_WORDS = frozenset(
+    {"inj", "injection", "tab", "tablet", "cap", "capsule", "syp", "syrup"}
+    | {"ointment", "drop", "infusion", "oxygen", "fluid", "saline", "drip"}
+)
+_DOSAGE_RE = re.compile(r"\d\s*(?:mg|mcg|ml|g|iu)\b", re.IGNORECASE)
+_STRENGTH_RE = re.compile(r"[a-z]\s*-?\s*\d+(?:\.\d+)?\s*$", re.IGNORECASE)
+
+
+def _keywords(text: str) -> set[str]:
+    """
+    Lower-cased words of three or more characters, minus filler words, with a
+    plural "s" dropped so "Fluids" and "Fluid" are the same word.
+    """
+    return {
+        word.removesuffix("s")
+        for word in _WORD_RE.findall(text.casefold())
+        if len(word) > 2 and word not in _STOPWORDS
+    }
+
+
+def sub_limit_keywords(sub_limits: dict) -> frozenset[str]:
+    """
+    The vocabulary an item shares at least one word with when it could fall
+    under one of the policy's sub-limits: every rule's name, description and
+    examples, plus the names of all payable master items.
+    """
+    words = set()
+    for rule_name, rule in sub_limits.items():
+        if rule is None:
+            continue
+        words |= _keywords(rule_name)
+        words |= _keywords(rule.get("description", ""))
+        for example in rule.get("examples", []):
+            words |= _keywords(example)
+    for master_item in MASTER_ITEM_LIST:
+        if master_item["category"] != "Non-Payable Item":
+            words |= _keywords(master_item["name"])
+    return frozenset(words | _MEDICINE_WORDS)
+
+
+def could_match_sub_limit(
+    description: str, keywords: frozenset[str], similarity: float
+) -> bool:
+    """
+    False only when the description shares no word with the policy's rule
+    vocabulary and its `similarity` to the closest rule is below
+    RULE_MATCH_PREFILTER_THRESHOLD, so a brand name no rule mentions still
+    reaches the matcher if it reads like one of the rules.
+    """
+    if _DOSAGE_RE.search(description) or _STRENGTH_RE.search(description):
+        return True
+    if not keywords.isdisjoint(_keywords(description)):
+        return True
+    return similarity >= settings.RULE_MATCH_PREFILTER_THRESHOLD
+
+
+# --- Local rule matching by embedding similarity ---
+def rule_similarities(
+    vectors: np.ndarray, anchor_vectors: np.ndarray, policy
+) -> np.ndarray:
+    """
+    The similarity of each row of `vectors` to each of the policy's rules,
+    scored as the rule's closest anchor (its name or one of its example items),
+    given `anchor_vectors`, the embeddings of `policy.rule_anchors`.
+    """
+    if not policy.rule_anchors:
+        return np.empty((len(vectors), len(policy.rule_names)), dtype=np.float32)
+    anchor_rules = np.array([index for _, index in policy.rule_anchors])
+    similarities = vectors @ anchor_vectors.T
+    return np.column_stack(
+        [
+            similarities[:, anchor_rules == index].max(axis=1)
+            for index in range(len(policy.rule_names))
+        ]
+    )
+
+
+def match_rules_locally(
+    similarities: np.ndarray, rule_names: tuple[str, ...]
+) -> dict[int, str]:
+    """
+    Matches rows to the rule they are most similar to, given their
+    `rule_similarities`, where that is clear-cut: at least
+    RULE_MATCH_LOCAL_THRESHOLD, and ahead of every other rule by
+    RULE_MATCH_LOCAL_MARGIN. Returns the rule name per matched row.
+    """
+    if similarities.size == 0:
+        return {}
+    rows = np.arange(len(similarities))
+    best = similarities.argmax(axis=1)
+    best_similarity = similarities[rows, best]
+    others = similarities.copy()
+    others[rows, best] = -np.inf
+    runner_up_similarity = others.max(axis=1)
+    return {
+        row: rule_names[best[row]]
+        for row in rows.tolist()
+        if best_similarity[row] >= settings.RULE_MATCH_LOCAL_THRESHOLD
+        and best_similarity[row] - runner_up_similarity[row]
+        >= settings.RULE_MATCH_LOCAL_MARGIN
+    }
@@ -1,36 +1,41 @@
 # app/rules_engine.py
-# app/rules_engine.py
-import os
-import sys
-
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-# --------------------------------------------
 
 import asyncio
-import time
-from datetime import date
-from typing import Tuple
+import logging
 
-from app.data.master_data import POLICY_RULEBOOK
-from app.normalization_service import NormalizationService
+from app.adjudication_cache import AdjudicationCache, cached_adjudication
+from app.config import settings
+from app.normalization_service import get_normalization_service
+from app.profiling import ClaimTrace
 from app.pydantic_schemas import (
     AdjudicatedClaim,
     AdjudicatedLineItem,
     ExtractedData,
     InsuranceDetails,
-    LineItem,
+    SanityCheckResult,
 )
+from app.rule_calculator import apply_policy_rule_to_rows, can_apply_deterministically
 from app.rules_utils import (
     apply_policy_rule_with_llm_tools,
-    get_rule_match_with_llm,
+    get_policy,
     identify_non_payable_items,
     run_final_sanity_check,
+    start_rule_matches,
 )
 
+logger = logging.getLogger(__name__)
+
+IRDAI_NON_PAYABLE_REASON = "Non-payable item as per IRDAI guidelines."
+
+adjudication_cache = AdjudicationCache(
+    path=settings.ADJUDICATION_CACHE_PATH, mode=settings.ADJUDICATION_CACHE_MODE
+)
 
+
+@cached_adjudication(adjudication_cache)
 async def adjudicate_claim(
     extracted_data: ExtractedData, insurance_details: InsuranceDetails
-) -> Tuple[AdjudicatedClaim, dict]:
+) -> AdjudicatedClaim:
     """
     The main orchestrator for the adjudication pipeline. It applies a series
     of rules to determine the final payable amount.
@@ -42,157 +47,223 @@ async def adjudicate_claim(
     Returns:
         The final, fully adjudicated claim object.
     """
+    trace = ClaimTrace(insurance_details.policy_number)
+    try:
+        return await _adjudicate_claim(extracted_data, insurance_details, trace)
+    finally:
+        # Failed claims are recorded too, with the stages they got through
+        trace.record()
+
+
+async def _adjudicate_claim(
+    extracted_data: ExtractedData,
+    insurance_details: InsuranceDetails,
+    trace: ClaimTrace,
+) -> AdjudicatedClaim:
     # --- Step 0: Create a copy of input ExtractedData to AdjudicatedClaim ---
 
     # Create AdjudicatedLineItem objects from the simple LineItem objects.
     # We initialize them as "Allowed" with the full amount.
-    policy = POLICY_RULEBOOK[insurance_details.policy_number]
+    policy = get_policy(insurance_details.policy_number)
     # print(policy)
+    # extracted_data was validated at the API boundary, so these copies skip
+    # re-validation.
     initial_adjudicated_items = [
-        AdjudicatedLineItem(
-            **item.model_dump(),  # Copies description, quantity, etc.
-            status="Allowed",
-            allowed_amount=item.total_amount,
-            disallowed_amount=0.0,
-            reason=None,
+        AdjudicatedLineItem.from_trusted(
+            dict(
+                item,  # Copies description, quantity, etc.
+                status="Allowed",
+                allowed_amount=item.total_amount,
+                disallowed_amount=0.0,
+                reason=None,
+            )
         )
         for item in extracted_data.line_items
     ]
 
     # Create the main AdjudicatedClaim object that we will work with.
-    adjudicated_claim = AdjudicatedClaim(
-        # Copy all header fields from the input data
-        hospital_name=extracted_data.hospital_name,
-        patient_name=extracted_data.patient_name,
-        bill_no=extracted_data.bill_no,
-        bill_date=extracted_data.bill_date,
-        admission_date=extracted_data.admission_date,
-        discharge_date=extracted_data.discharge_date,
-        # Use the newly created list of adjudicated items
-        adjudicated_line_items=initial_adjudicated_items,
-        # Initialize total amounts
-        total_claimed_amount=extracted_data.net_payable_amount,
-        total_amount_reimbursed=extracted_data.net_payable_amount,  # Starts as the full amount
-        adjustments_log=[],
+    adjudicated_claim = AdjudicatedClaim.from_trusted(
+        dict(
+            # Copy all header fields from the input data
+            hospital_name=extracted_data.hospital_name,
+            patient_name=extracted_data.patient_name,
+            bill_no=extracted_data.bill_no,
+            bill_date=extracted_data.bill_date,
+            admission_date=extracted_data.admission_date,
+            discharge_date=extracted_data.discharge_date,
+            # Use the newly created list of adjudicated items
+            adjudicated_line_items=initial_adjudicated_items,
+            # Initialize total amounts
+            total_claimed_amount=extracted_data.net_payable_amount,
+            total_amount_reimbursed=extracted_data.net_payable_amount,  # Starts as the full amount
+            adjustments_log=[],
+        )
     )
 
     # In the next steps, we will modify this 'adjudicated_claim' object.
 
     # --- Step 1: Find and update IRDAI non-payable items ---
 
-    normalizationservice = NormalizationService()
-    non_payable_list = identify_non_payable_items(
+    # A set of descriptions for fast lookup.
+    non_payable_descriptions = identify_non_payable_items(
         line_items=adjudicated_claim.adjudicated_line_items,
-        service=normalizationservice,
+        service=get_normalization_service(),
     )
-    # Create a set of descriptions for fast lookup.
-    non_payable_descriptions = [item.description for item in non_payable_list]
-    print(non_payable_descriptions)
+    logger.debug("Non-payable descriptions: %s", non_payable_descriptions)
     # Now, loop through the main list and update the status for matching items.
     total_disallowed_IRDAI = 0.0
+    excluded_descriptions = []
     for item in adjudicated_claim.adjudicated_line_items:
         if item.description in non_payable_descriptions:
+            excluded_descriptions.append(item.description)
             total_disallowed_IRDAI = total_disallowed_IRDAI + item.allowed_amount
-            # item.status = "Disallowed"
+            # Set the status once here; Steps 2 and 3 branch on it instead of
+            # re-deriving it from the amounts.
+            item.status = "Disallowed"
             item.allowed_amount = 0.0
             item.disallowed_amount = item.total_amount
-            item.reason = "Non-payable item as per IRDAI guidelines."
-    items = ",".join(non_payable_descriptions)
+            item.reason = IRDAI_NON_PAYABLE_REASON
+    items = ",".join(excluded_descriptions)
     if total_disallowed_IRDAI > 0.0:
         adjudicated_claim.adjustments_log.append(
             f"The items {items}  not allowed because they are categorised as Non-Payable by IRDAI constituting to: ₹{total_disallowed_IRDAI:,.2f}"
         )
 
-    # --- Step 2: Find Matching Sub-Limit Rules in Parallel ---
-    step2_start_time = time.time()
-    print("--- Starting Step 2: Finding matching policy rules in parallel... ---")
+    trace.lap("non_payable")
+
+    # --- Steps 2 & 3: Find and Apply Matching Sub-Limit Rules in Parallel ---
+    logger.info("Starting Steps 2 & 3: matching and applying policy rules")
     # print(POLICY_RULEBOOK)
-    sub_limits = policy.get("sub_limits", {})
+    sub_limits = policy.sub_limits
+    sum_insured = policy.sum_insured
 
-    # Create a list of tasks to run concurrently
-    match_tasks = []
+    # Only check items that are still allowed; the ones disallowed in Step 1
+    # are set aside and added back unchanged afterwards.
     items_to_process = []
+    disallowed_items = []
     for item in adjudicated_claim.adjudicated_line_items:
-        # Only check items that are still allowed
-        if item.status != "Disallowed":
+        if item.status == "Disallowed":
+            disallowed_items.append(item)
+        else:
             items_to_process.append(item)
-            match_tasks.append(get_rule_match_with_llm(item.description, sub_limits))
-
-    # Run all the LLM calls for rule matching at the same time
-    matched_rule_names = await asyncio.gather(*match_tasks)
-    # --- Step 3: Apply Matched Rules ---
-    print("\n--- Starting Step 3: Applying matched rules... ---")
-    final_adjudicated_items = []
-    items_to_update = []
-    update_tasks = []
-    sum_insured = policy["sum_insured"]
-    for i, item in enumerate(items_to_process):
-        rule_name = matched_rule_names[i]
-        if rule_name and rule_name in sub_limits:
-            print(
-                f"Rule '{rule_name}' applies to item '{item.description}'. Preparing to apply."
+
+    # Bills often repeat a description across rows, so each distinct
+    # description is matched once and shared by every row that has it. Nothing
+    # is matched when the policy has no sub-limits.
+    match_tasks = start_rule_matches(
+        (
+            list(dict.fromkeys(item.description for item in items_to_process))
+            if policy.rule_names
+            else []
+        ),
+        policy=policy,
+        service=get_normalization_service(),
+    )
+
+    # Descriptions whose rule the calculator applies, once all rows are matched
+    calculated_rules: dict[str, str] = {}
+
+    async def match_and_apply(item: AdjudicatedLineItem) -> AdjudicatedLineItem:
+        """
+        Applies the item's rule as soon as its own match is known, rather than
+        waiting for every item in the bill to be matched first.
+        """
+        match_task = match_tasks.get(item.description)
+        rule_name = await match_task if match_task else None
+        if not (rule_name and rule_name in sub_limits):
+            # If no rule applies, keep the item as is
+            return item
+        logger.debug(
+            "Rule '%s' applies to item '%s'. Preparing to apply.",
+            rule_name,
+            item.description,
+        )
+        if can_apply_deterministically(sub_limits[rule_name]):
+            calculated_rules[item.description] = rule_name
+            return item
+        return await apply_policy_rule_with_llm_tools(
+            item, sub_limits[rule_name], sum_insured
+        )
+
+    if match_tasks:
+        # Identical rows adjudicate identically, so each distinct row runs once
+        row_keys = [item.model_dump_json() for item in items_to_process]
+        unique_rows = dict(zip(row_keys, items_to_process))
+        results_by_key = dict(
+            zip(
+                unique_rows,
+                await asyncio.gather(*map(match_and_apply, unique_rows.values())),
             )
-            policy_rule_to_apply = sub_limits[rule_name]
-            # Create a task to apply the rule (can also be run in parallel)
-            update_tasks.append(
-                apply_policy_rule_with_llm_tools(
-                    item, policy_rule_to_apply, sum_insured
-                )
+        )
+        final_adjudicated_items = [results_by_key[key].model_copy() for key in row_keys]
+
+        # A limit for the whole claim is shared by every row under the rule,
+        # duplicates included, so those rules are applied across their rows
+        rows_by_rule: dict[str, list[int]] = {}
+        for position, item in enumerate(final_adjudicated_items):
+            if item.description in calculated_rules:
+                rule_name = calculated_rules[item.description]
+                rows_by_rule.setdefault(rule_name, []).append(position)
+        for rule_name, positions in rows_by_rule.items():
+            adjudicated_rows = apply_policy_rule_to_rows(
+                [final_adjudicated_items[position] for position in positions],
+                sub_limits[rule_name],
+                sum_insured,
             )
-            items_to_update.append(item)
-        else:
-            # If no rule applies, keep the item as is
-            final_adjudicated_items.append(item)
+            for position, adjudicated_item in zip(positions, adjudicated_rows):
+                final_adjudicated_items[position] = adjudicated_item
+    else:
+        # No item can fall under a sub-limit, so every row stays as it is
+        final_adjudicated_items = items_to_process
+
+    # Matching and applying overlap per item, so they are timed as one stage
+    trace.lap("rule_match_and_apply")
 
-    # Run the rule application calls
-    if update_tasks:
-        updated_items = await asyncio.gather(*update_tasks)
-        final_adjudicated_items.extend(updated_items)
+    # Total the policy deductions and the allowed amount in one pass. The
+    # Step 1 items add nothing to either: nothing of theirs is allowed, and
+    # their deduction is already logged as an IRDAI exclusion.
+    total_disallowed_policy = 0.0
+    final_total_allowed = 0.0
+    for item in final_adjudicated_items:
+        final_total_allowed += item.allowed_amount
+        if item.reason != IRDAI_NON_PAYABLE_REASON:
+            total_disallowed_policy += item.disallowed_amount
+    # The claim is built with from_trusted, so its Amount fields aren't rounded
+    # on assignment; every total is rounded to paise here instead
+    final_total_allowed = round(final_total_allowed, 2)
+    total_disallowed_policy = round(total_disallowed_policy, 2)
 
     # Add back the items that were already disallowed from Step 1
-    disallowed_items = [
-        item
-        for item in adjudicated_claim.adjudicated_line_items
-        if item.status == "Disallowed"
-    ]
     final_adjudicated_items.extend(disallowed_items)
 
     adjudicated_claim.adjudicated_line_items = final_adjudicated_items
 
-    total_disallowed_policy = 0.0
-    for items in adjudicated_claim.adjudicated_line_items:
-        if items.reason != "Non-payable item as per IRDAI guidelines.":
-            total_disallowed_policy += items.disallowed_amount
     if total_disallowed_policy > 0.0:
         # Log the total disallowed amount due to policy rules
         adjudicated_claim.adjustments_log.append(
             f"The amount deducted due to  insurance policy rules is: ₹{total_disallowed_policy:,.2f}."
         )
-    print(f"Total disallowed due to policy rules: ₹{total_disallowed_policy:,.2f}")
+    logger.info("Total disallowed due to policy rules: ₹%.2f", total_disallowed_policy)
     # --- Step 4: Final Calculations & Claim-Level Rules ---
     # print("\n--- Starting Step 4: Final Calculations & Claim-Level Rules ---")
 
-    # 4a. Recalculate the true totals after all item-level rules
-    final_total_allowed = sum(
-        item.allowed_amount for item in adjudicated_claim.adjudicated_line_items
-    )
-
+    # 4a. The true totals after all item-level rules were summed above
     adjudicated_claim.total_amount_reimbursed = final_total_allowed
 
     # 4b. Apply the co-payment rule
-    co_payment_percentage = policy.get("co_payment_percentage", 0)
+    co_payment_percentage = policy.co_payment_percentage
     co_payment_amount = 0.0
 
     if co_payment_percentage > 0:
-        co_payment_amount = (final_total_allowed * co_payment_percentage) / 100
+        co_payment_amount = round(final_total_allowed * co_payment_percentage / 100, 2)
         adjudicated_claim.adjustments_log.append(
             f"Applied {co_payment_percentage}% co-payment on allowed amount: ₹{co_payment_amount:,.2f}"
         )
 
-    amount_after_copay = final_total_allowed - co_payment_amount
+    amount_after_copay = round(final_total_allowed - co_payment_amount, 2)
 
     # --- NEW: Rule 4 - Capping to Sum Insured ---
-    final_payable = min(amount_after_copay, sum_insured)
+    final_payable = round(min(amount_after_copay, sum_insured), 2)
 
     if final_payable < amount_after_copay:
         # This condition is true only if the sum insured limit was hit
@@ -201,15 +272,35 @@ async def adjudicate_claim(
         )
 
     adjudicated_claim.total_amount_reimbursed = final_payable
+    trace.lap("totals")
     # --- Step 5: Final AI Sanity Check (The AI Auditor) ---
-    print("\n--- Starting Step 5: Final AI Sanity Check ---")
+    # A claim paid exactly as billed, with no adjustments at all, gives the
+    # auditor nothing to review, so the LLM call is skipped for it.
+    needs_audit = bool(adjudicated_claim.adjustments_log) or final_payable != round(
+        adjudicated_claim.total_claimed_amount, 2
+    )
+
+    if not needs_audit:
+        logger.info("Skipping Step 5: claim paid in full, nothing to audit")
+        sanity_result = SanityCheckResult(
+            is_reasonable=True,
+            reasoning="The claim is paid in full as billed, with no adjustments to review.",
+        )
+    elif settings.SANITY_CHECK_IN_BACKGROUND:
+        # The payout is final without the audit, so the caller runs it after
+        # responding and stores it on the claim record.
+        logger.info("Deferring Step 5: final AI sanity check")
+        sanity_result = None
+    else:
+        logger.info("Starting Step 5: final AI sanity check")
 
-    # The 'adjudicated_claim' object is now fully calculated.
-    # We pass it to our new auditor for a final review.
-    sanity_result = await run_final_sanity_check(adjudicated_claim)
+        # The 'adjudicated_claim' object is now fully calculated.
+        # We pass it to our new auditor for a final review.
+        sanity_result = await run_final_sanity_check(adjudicated_claim)
 
     # Attach the auditor's report to the final claim object
     adjudicated_claim.sanity_check_result = sanity_result
+    trace.lap("sanity_check")
 
-    print("--- ✅ Adjudication and Final Audit Complete ---")
+    logger.info("Adjudication and final audit complete")
     return adjudicated_claim
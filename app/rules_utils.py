@@ -212,88 +212,374 @@
 #         raise
 
 
+import asyncio
+import functools
+import logging
 import operator
-import os
 import sys
+from dataclasses import dataclass
 from typing import Tuple
 
-# Add the root project directory to the Python path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-
-from langchain.agents import AgentExecutor, create_tool_calling_agent
+import numpy as np
+from langchain_core.messages import BaseMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import tool
-
-# --- NEW: Import Gemini and the modern agent creator ---
 from langchain_google_genai import ChatGoogleGenerativeAI
+from redis.asyncio import Redis
 
+from app.async_batcher import AsyncBatcher
+from app.circuit_breaker import CircuitBreaker
 from app.config import settings
+from app.data.master_data import POLICY_RULEBOOK
 from app.normalization_service import NormalizationService
-from app.pydantic_schemas import AdjudicatedLineItem, LineItem, PolicyRuleMatch
+from app.pydantic_schemas import (
+    AdjudicatedLineItem,
+    LineItem,
+    PolicyRuleMatchBatch,
+)
+from app.rule_calculator import apply_policy_rule_deterministically
+from app.rule_match_cache import (
+    RedisRuleMatchStore,
+    RuleMatchCache,
+    SemanticRuleMatchCache,
+    cached_rule_application,
+    cached_rule_match,
+    sub_limits_signature,
+)
+from app.rule_matching import (
+    could_match_sub_limit,
+    match_rules_locally,
+    rule_similarities,
+    sub_limit_keywords,
+)
+
+logger = logging.getLogger(__name__)
 
-# --- Your existing functions and tools ---
+# --- Bounded Gemini calls ---
+
+# Caps how many Gemini requests this process has in flight at once, so a large
+# bill doesn't burst past the provider's rate limit and stall on 429 retries.
+_llm_semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+
+# While Gemini is failing, reject calls at once instead of letting every item
+# of every claim wait out its own timeout
+llm_circuit_breaker = CircuitBreaker(
+    "Gemini",
+    failure_threshold=settings.LLM_BREAKER_FAILURES,
+    window=settings.LLM_BREAKER_WINDOW_SECONDS,
+    cooldown=settings.LLM_BREAKER_COOLDOWN_SECONDS,
+)
+
+
+async def _bounded(coro):
+    """
+    Awaits an LLM call once a concurrency slot is free, giving up after
+    LLM_TIMEOUT_SECONDS. Raises CircuitOpenError while Gemini is failing.
+    """
+    try:
+        async with _llm_semaphore:
+            return await llm_circuit_breaker.call(
+                lambda: asyncio.wait_for(coro, timeout=settings.LLM_TIMEOUT_SECONDS)
+            )
+    finally:
+        # No-op once awaited; closes the call if the circuit rejected it
+        coro.close()
 
 
-# This function remains unchanged
 def identify_non_payable_items(
     line_items: list[LineItem], service: NormalizationService
-) -> list[LineItem]:
-    """Identifies and returns a list of line items that are categorized as non-payable."""
-    # ... (logic is the same)
-    non_payable_items_found = []
-    for item in line_items:
-        normalized_item = service.normalize_description(description=item.description)
-        if normalized_item and normalized_item["category"] == "Non-Payable Item":
-            non_payable_items_found.append(item)
-    return non_payable_items_found
-
-
-# --- NEW: Initialize the Gemini LLM for structured output ---
+) -> frozenset[str]:
+    """Identifies the descriptions of line items that are categorized as non-payable."""
+    # All descriptions are normalized in a single batched embedding call
+    normalized_items = service.normalize_descriptions(
+        [item.description for item in line_items]
+    )
+    return frozenset(
+        item.description
+        for item, normalized_item in zip(line_items, normalized_items)
+        if normalized_item and normalized_item["id"] in service.non_payable_ids
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class PolicyContext:
+    """A policy's rulebook entry, with the values derived from it precomputed."""
+
+    sub_limits: dict
+    sum_insured: float
+    co_payment_percentage: float
+    rule_names: tuple[str, ...]
+    rule_keywords: frozenset[str]
+    # (text, index into rule_names) for each rule's name and example items
+    rule_anchors: tuple[tuple[str, int], ...]
+    sub_limits_sha: str
+
+    @classmethod
+    def from_rulebook_entry(cls, policy: dict) -> "PolicyContext":
+        """Builds the context for one POLICY_RULEBOOK entry."""
+        sub_limits = policy.get("sub_limits", {})
+        rule_names = tuple(
+            sys.intern(rule_name)
+            for rule_name, rule in sub_limits.items()
+            if rule is not None
+        )
+        return cls(
+            sub_limits=sub_limits,
+            sum_insured=policy["sum_insured"],
+            co_payment_percentage=policy.get("co_payment_percentage", 0),
+            rule_names=rule_names,
+            rule_keywords=sub_limit_keywords(sub_limits),
+            rule_anchors=tuple(
+                (text, index)
+                for index, rule_name in enumerate(rule_names)
+                for text in [rule_name, *sub_limits[rule_name].get("examples", [])]
+            ),
+            sub_limits_sha=sub_limits_signature(sub_limits),
+        )
+
+
+@functools.lru_cache(maxsize=1024)
+def get_policy(policy_number: str) -> PolicyContext:
+    """Looks up a policy in the rulebook. Built once per policy."""
+    return PolicyContext.from_rulebook_entry(POLICY_RULEBOOK[policy_number])
+
+
+# --- Rule matching with Gemini ---
 llm_match = ChatGoogleGenerativeAI(
     model="gemini-2.5-flash",
     google_api_key=settings.GEMINI_API_KEY,
     convert_system_message_to_human=True,  # Recommended for Gemini
 )
-structured_llm_match = llm_match.with_structured_output(PolicyRuleMatch)
-
+structured_llm_match = llm_match.with_structured_output(PolicyRuleMatchBatch)
 
-async def get_rule_match_with_llm(
-    item_description: str, sub_limits: dict
-) -> str | None:
-    """Uses the Gemini LLM to find a rule that matches the item description."""
-    list_of_rule_names = [
-        policy_name
-        for policy_name in sub_limits.keys()
-        if sub_limits.get(policy_name) is not None
+# Using a robust prompt template
+MATCH_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You are an expert insurance adjudicator. Your task is to match each medical bill item to a specific policy rule. For every item number, respond only with the name of the matching rule or null.",
+        ),
+        (
+            "human",
+            "Medical Item Descriptions:\n{item_descriptions}\n\nAvailable Policy Rules: {list_of_rule_names}",
+        ),
     ]
+)
+match_chain = MATCH_PROMPT | structured_llm_match
+
+# Rule matches depend only on the description and the policy's sub-limits, and
+# bills repeat the same items ("Room Rent", "Consultation") within and across
+# claims, so answers are kept in memory instead of asking the LLM again.
+rule_match_cache = RuleMatchCache(maxsize=settings.RULE_MATCH_CACHE_SIZE)
+rule_match_store = (
+    RedisRuleMatchStore(
+        Redis.from_url(settings.REDIS_URL),
+        ttl_seconds=settings.RULE_MATCH_REDIS_TTL_SECONDS,
+    )
+    if settings.RULE_MATCH_REDIS_TTL_SECONDS
+    else None
+)
 
-    # Using a robust prompt template
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                "You are an expert insurance adjudicator. Your task is to match a medical bill item to a specific policy rule. Respond only with the name of the matching rule or null.",
+
+async def _match_rules_with_llm(
+    item_descriptions: list[str], list_of_rule_names: tuple[str, ...]
+) -> list[str | None | Exception]:
+    """
+    Uses the Gemini LLM to match each item description to one of the rules.
+    Items the answer leaves out are asked about again one at a time; an item
+    still unanswered gets an exception in its place, never a guessed None.
+    """
+    response = await _bounded(
+        match_chain.ainvoke(
+            {
+                "item_descriptions": "\n".join(
+                    f"{number}. '{description}'"
+                    for number, description in enumerate(item_descriptions, start=1)
+                ),
+                "list_of_rule_names": list(list_of_rule_names),
+            }
+        )
+    )
+
+    logger.debug("LLM response for the items %s: %s", item_descriptions, response)
+    if response is None:
+        raise ValueError(f"No rule match response for the items {item_descriptions}")
+    rule_names = {}
+    for match in response.matches:
+        if 1 <= match.item_number <= len(item_descriptions):
+            rule_names[match.item_number - 1] = match.applicable_rule_name or None
+
+    missing = [row for row in range(len(item_descriptions)) if row not in rule_names]
+    if missing and len(item_descriptions) == 1:
+        raise ValueError(f"No rule match answer for '{item_descriptions[0]}'")
+    if missing:
+        logger.warning(
+            "Rule match answer left out %d of %d items, asking again one by one",
+            len(missing),
+            len(item_descriptions),
+        )
+        retries = await asyncio.gather(
+            *(
+                _match_rules_with_llm([item_descriptions[row]], list_of_rule_names)
+                for row in missing
             ),
-            (
-                "human",
-                "Medical Item Description: '{item_description}'\n\nAvailable Policy Rules: {list_of_rule_names}",
+            return_exceptions=True,
+        )
+        for row, retry in zip(missing, retries):
+            rule_names[row] = retry if isinstance(retry, Exception) else retry[0]
+    return [rule_names[row] for row in range(len(item_descriptions))]
+
+
+class RuleMatchBatcher(AsyncBatcher):
+    """Sends rule-matching lookups to the LLM in batches, one call per rule set."""
+
+    async def process_batch(
+        self, items: list[tuple[str, tuple[str, ...]]]
+    ) -> list[str | None | Exception]:
+        descriptions_by_rules: dict[tuple[str, ...], list[str]] = {}
+        for item_description, list_of_rule_names in items:
+            descriptions_by_rules.setdefault(list_of_rule_names, []).append(
+                item_description
+            )
+        # A failed call fails only its own rule set's items, not the lookups
+        # from other claims that happened to share the batch
+        answers = await asyncio.gather(
+            *(
+                _match_rules_with_llm(item_descriptions, list_of_rule_names)
+                for list_of_rule_names, item_descriptions in descriptions_by_rules.items()
             ),
-        ]
-    )
+            return_exceptions=True,
+        )
+        matches = {}
+        for (list_of_rule_names, item_descriptions), answer in zip(
+            descriptions_by_rules.items(), answers
+        ):
+            for row, item_description in enumerate(item_descriptions):
+                matches[(item_description, list_of_rule_names)] = (
+                    answer if isinstance(answer, BaseException) else answer[row]
+                )
+        return [matches[item] for item in items]
+
+
+rule_match_batcher = RuleMatchBatcher(
+    max_batch_size=settings.RULE_MATCH_BATCH_SIZE,
+    max_queue_time=settings.RULE_MATCH_BATCH_WAIT_MS / 1000,
+)
 
-    chain = prompt | structured_llm_match
 
-    response = await chain.ainvoke(
-        {"item_description": item_description, "list_of_rule_names": list_of_rule_names}
-    )
+@cached_rule_match(rule_match_cache, store=rule_match_store)
+async def get_rule_match_with_llm(
+    item_description: str, policy: PolicyContext
+) -> str | None:
+    """
+    Finds the rule that matches the item description. Lookups made at the same
+    time, by this claim or any other being adjudicated, share one LLM call.
+    """
+    return await rule_match_batcher.submit((item_description, policy.rule_names))
 
-    print(f"LLM Response for the item : {item_description} is : {response}")
-    if response and response.applicable_rule_name:
-        return response.applicable_rule_name
-    return None
 
+semantic_rule_match_cache = SemanticRuleMatchCache(
+    threshold=settings.RULE_MATCH_SEMANTIC_THRESHOLD,
+    maxsize=settings.RULE_MATCH_CACHE_SIZE,
+)
+
+
+def _remember_rule_match(
+    signature: str, vector: np.ndarray, task: asyncio.Future
+) -> None:
+    if not task.cancelled() and task.exception() is None:
+        semantic_rule_match_cache.add(signature, vector, task.result())
 
-# --- Math tools remain unchanged ---
+
+def start_rule_matches(
+    item_descriptions: list[str],
+    policy: PolicyContext,
+    service: NormalizationService,
+) -> dict[str, asyncio.Future]:
+    """
+    Starts matching each description to one of the policy's sub-limits and
+    returns a future per description. Descriptions that share no word with the
+    rules and aren't close to any of them are taken to match none; those close
+    enough to one matched before are answered from the semantic cache, and
+    those clearly closest to one rule's name or examples are matched locally.
+    The rest go to the LLM, and their answers are added to the semantic cache.
+    """
+    if not (
+        (
+            settings.RULE_MATCH_PREFILTER
+            or settings.RULE_MATCH_SEMANTIC_CACHE
+            or settings.RULE_MATCH_LOCAL
+        )
+        and item_descriptions
+    ):
+        return {
+            description: asyncio.ensure_future(
+                get_rule_match_with_llm(description, policy)
+            )
+            for description in item_descriptions
+        }
+
+    vectors = service.embed_descriptions(item_descriptions)
+    similarities = (
+        rule_similarities(
+            vectors,
+            service.embed_descriptions([text for text, _ in policy.rule_anchors]),
+            policy,
+        )
+        if settings.RULE_MATCH_PREFILTER or settings.RULE_MATCH_LOCAL
+        else None
+    )
+    no_matches = (
+        {
+            row
+            for row, description in enumerate(item_descriptions)
+            if not could_match_sub_limit(
+                description,
+                policy.rule_keywords,
+                similarities[row].max(initial=-1.0),
+            )
+        }
+        if settings.RULE_MATCH_PREFILTER
+        else set()
+    )
+    cache_hits = (
+        semantic_rule_match_cache.lookup(policy.sub_limits_sha, vectors)
+        if settings.RULE_MATCH_SEMANTIC_CACHE
+        else {}
+    )
+    local_matches = (
+        match_rules_locally(similarities, policy.rule_names)
+        if settings.RULE_MATCH_LOCAL
+        else {}
+    )
+    loop = asyncio.get_running_loop()
+    matches = {}
+    for row, description in enumerate(item_descriptions):
+        if row in no_matches or row in cache_hits or row in local_matches:
+            if row in no_matches:
+                logger.debug("'%s' is unlike every rule, not matching it", description)
+                rule_name = None
+            elif row in cache_hits:
+                logger.debug("Semantic cache hit for '%s'", description)
+                rule_name = cache_hits[row]
+            else:
+                logger.debug("Matched '%s' locally", description)
+                rule_name = local_matches[row]
+            matches[description] = loop.create_future()
+            matches[description].set_result(rule_name)
+            continue
+        task = asyncio.ensure_future(get_rule_match_with_llm(description, policy))
+        if settings.RULE_MATCH_SEMANTIC_CACHE:
+            task.add_done_callback(
+                functools.partial(
+                    _remember_rule_match, policy.sub_limits_sha, vectors[row]
+                )
+            )
+        matches[description] = task
+    return matches
+
+
+# --- Math tools for the rule agent ---
 @tool
 def multiply(a: float, b: float) -> float:
     """Multiplies two numbers."""
@@ -324,15 +610,25 @@ def percentage(part: float, whole: float) -> float:
     return (part / 100) * whole
 
 
-# ... (add, subtract, divide, percentage tools are the same)
+@tool(args_schema=AdjudicatedLineItem)
+def submit_adjudicated_line_item(**line_item) -> AdjudicatedLineItem:
+    """Submits the final, updated line item. Call this once, as your last step."""
+    return AdjudicatedLineItem(**line_item)
+
 
-# --- NEW: Set up the Gemini Agent ---
+# --- The Gemini rule agent ---
+# The agent finishes by calling `submit_adjudicated_line_item`, whose arguments
+# are the answer, so no second call is needed to structure it
 tools = [multiply, divide, add, subtract, percentage]
+tools_by_name = {math_tool.name: math_tool for math_tool in tools}
 
 # Use the Gemini model for the agent
 llm_agent = ChatGoogleGenerativeAI(
     model="gemini-2.5-pro", google_api_key=settings.GEMINI_API_KEY, temperature=0.0
 )
+llm_agent_with_tools = llm_agent.bind_tools([*tools, submit_adjudicated_line_item])
+# An agent run that hasn't submitted after this many model turns is abandoned
+AGENT_MAX_TURNS = 8
 
 AGENT_PROMPT = ChatPromptTemplate.from_messages(
     [
@@ -342,6 +638,7 @@ AGENT_PROMPT = ChatPromptTemplate.from_messages(
 Your task is to apply a single policy rule to a single line item and calculate the final allowed amount.
 
 **CRITICAL INSTRUCTION: You MUST use the provided tools for all mathematical calculations, even for simple ones. Do NOT perform calculations yourself.**
+Request every calculation that doesn't depend on another one's result in the same turn, as parallel tool calls.
 
 **You must follow these steps to reason:**
 1.  First, identify the **'claimed amount'**, the **'quantity'**, and the specific **'policy rule'** from the context.
@@ -350,7 +647,7 @@ Your task is to apply a single policy rule to a single line item and calculate t
 4.  Fourth, compare this calculated maximum with the originally claimed amount for the line item.
 5.  The final **'allowed amount'** for this item is the **lesser** of these two values (the calculated maximum and the claimed amount).
 
-Provide your final answer by summarizing the updated AdjudicatedLineItem object.
+Provide your final answer by calling `submit_adjudicated_line_item` with the updated line item.
 """,
         ),
         (
@@ -361,43 +658,98 @@ Provide your final answer by summarizing the updated AdjudicatedLineItem object.
     ]
 )
 
-# Use the modern, model-agnostic agent creator
-agent = create_tool_calling_agent(llm_agent, tools, AGENT_PROMPT)
-agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True).with_retry()
 
-# --- NEW: Set up the Gemini LLM for final formatting ---
-llm_formatter = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash", google_api_key=settings.GEMINI_API_KEY, temperature=0.0
+async def _run_rule_agent(input_prompt: str, config: dict) -> AdjudicatedLineItem:
+    """
+    Runs the tool-calling loop directly on the Gemini client. Each model turn
+    may request several calculations at once; they are all computed locally
+    and sent back together, until the model submits the line item.
+    """
+    scratchpad: list[BaseMessage] = []
+    for _ in range(AGENT_MAX_TURNS):
+        response = await _bounded(
+            llm_agent_with_tools.ainvoke(
+                AGENT_PROMPT.format_messages(
+                    input=input_prompt, agent_scratchpad=scratchpad
+                ),
+                config=config,
+            )
+        )
+        if not response.tool_calls:
+            raise ValueError(
+                f"The agent finished without submitting the line item: {response.content}"
+            )
+        for tool_call in response.tool_calls:
+            if tool_call["name"] == submit_adjudicated_line_item.name:
+                return AdjudicatedLineItem.model_validate(tool_call["args"])
+        scratchpad.append(response)
+        for tool_call in response.tool_calls:
+            if tool_call["name"] not in tools_by_name:
+                raise ValueError(f"The agent called an unknown tool: {tool_call}")
+            scratchpad.append(tools_by_name[tool_call["name"]].invoke(tool_call))
+    raise ValueError(
+        f"The agent didn't submit the line item within {AGENT_MAX_TURNS} turns."
+    )
+
+
+# The same bill row under the same rule always adjudicates the same way, and
+# rows like "Room Rent x 3 days" recur across claims, so the agent's answers
+# are kept in memory and, like rule matches, in Redis
+rule_application_cache = RuleMatchCache(maxsize=settings.RULE_MATCH_CACHE_SIZE)
+rule_application_store = (
+    RedisRuleMatchStore(
+        Redis.from_url(settings.REDIS_URL),
+        ttl_seconds=settings.RULE_APPLICATION_REDIS_TTL_SECONDS,
+        prefix="rule_application",
+    )
+    if settings.RULE_APPLICATION_REDIS_TTL_SECONDS
+    else None
 )
-llm_structured_final = llm_formatter.with_structured_output(AdjudicatedLineItem)
 
 
-# --- The Main Function (unchanged logic, just uses the new Gemini agent) ---
+# --- Applying a sub-limit rule ---
 async def apply_policy_rule_with_llm_tools(
     item: AdjudicatedLineItem, policy_rule: dict, sum_insured: float
 ) -> AdjudicatedLineItem:
-    """Uses a tool-based Gemini agent to apply a flexible sub-limit rule."""
+    """
+    Applies a flexible sub-limit rule: directly when the rule is a simple
+    limit, otherwise with a tool-based Gemini agent.
+    """
     if item.status == "Disallowed":
         return item
 
+    adjudicated_item = apply_policy_rule_deterministically(
+        item, policy_rule, sum_insured
+    )
+    if adjudicated_item is not None:
+        return adjudicated_item
+    return await _apply_policy_rule_with_agent(item, policy_rule, sum_insured)
+
+
+@cached_rule_application(rule_application_cache, store=rule_application_store)
+async def _apply_policy_rule_with_agent(
+    item: AdjudicatedLineItem, policy_rule: dict, sum_insured: float
+) -> AdjudicatedLineItem:
+    """Uses a tool-based Gemini agent to apply a sub-limit rule."""
     input_prompt = f"""
     - Current Line Item: {item.model_dump_json()}
     - Policy Rule to Apply: {policy_rule}
     - Total sum insured: {sum_insured}
 
-    Please perform the calculation and provide the final, updated AdjudicatedLineItem object as your answer.
+    Please perform the calculation and submit the final, updated AdjudicatedLineItem.
     """
     try:
-        # Stage 1: Invoke the reasoning agent
-        result = await agent_executor.ainvoke({"input": input_prompt})
-
-        # Stage 2: Format the output using a structured Gemini call
-        prompt = f"Your are a structure agent your task is to get the output in the format specified output: {result['output']}"
-        final_result = await llm_structured_final.ainvoke(prompt)
-
-        return final_result
+        # Each model turn is tagged, so traces can be found per item
+        return await _run_rule_agent(
+            input_prompt,
+            config={
+                "run_name": "apply_policy_rule",
+                "tags": ["rule_application"],
+                "metadata": {"item_description": item.description},
+            },
+        )
     except Exception as e:
-        print(f"An error occurred with the LLM tool agent: {e}")
+        logger.exception("An error occurred with the LLM tool agent: %s", e)
         raise
 
 
@@ -412,32 +764,23 @@ gemini_llm = ChatGoogleGenerativeAI(
 
 llm_formatter = gemini_llm.with_structured_output(SanityCheckResult)
 
+FLAG_CATEGORIES = [
+    "Calculation Error",
+    "Logic Inconsistency",
+    "High Cost Anomaly",
+    "Missing Information",
+    "Policy Misinterpretation",
+]
 
-
-
-async def run_final_sanity_check(
-    adjudicated_claim: AdjudicatedClaim,
-) -> SanityCheckResult:
-    """
-    Uses Gemini to perform a final sanity check on the adjudicated claim object.
-    """
-    FLAG_CATEGORIES = [
-        "Calculation Error",
-        "Logic Inconsistency",
-        "High Cost Anomaly",
-        "Missing Information",
-        "Policy Misinterpretation",
-    ]
-
-    input_prompt = f"""
+SANITY_CHECK_PROMPT = ChatPromptTemplate.from_template("""
     You are a professional claims processor with over 20 years of experience.
     Your task is to perform a final sanity check on the adjudicated claim object provided below.
 
     Adjudicated Claim Details:
-    {adjudicated_claim.model_dump_json(indent=2)}
+    {adjudicated_claim}
 
     **Predefined Flag Categories:**
-    `{FLAG_CATEGORIES}`
+    `{flag_categories}`
 
     ---
     **Instructions:**
@@ -447,10 +790,37 @@ async def run_final_sanity_check(
 
     Respond ONLY with a valid JSON object following the specified schema.
     ---
-    """
+    """)
+sanity_check_chain = SANITY_CHECK_PROMPT | llm_formatter
 
+# Fields that don't bear on whether the adjudication is reasonable, left out of
+# the prompt along with unset fields and indentation to keep it short
+_SANITY_CHECK_EXCLUDE = {
+    "hospital_name",
+    "patient_name",
+    "bill_no",
+    "sanity_check_result",
+    "claim_id",
+}
+
+
+async def run_final_sanity_check(
+    adjudicated_claim: AdjudicatedClaim,
+) -> SanityCheckResult:
+    """
+    Uses Gemini to perform a final sanity check on the adjudicated claim object.
+    """
     # Invoke the Gemini LLM
-    response = await llm_formatter.ainvoke(input_prompt)
-    print(f"Sanity Check LLM Response: {response}")
+    response = await _bounded(
+        sanity_check_chain.ainvoke(
+            {
+                "adjudicated_claim": adjudicated_claim.model_dump_json(
+                    exclude=_SANITY_CHECK_EXCLUDE, exclude_none=True
+                ),
+                "flag_categories": FLAG_CATEGORIES,
+            }
+        )
+    )
+    logger.debug("Sanity check LLM response: %s", response)
 
     return response
@@ -151,7 +151,10 @@ from pdf2image import convert_from_bytes
 from pydantic import ValidationError
 
 from .config import settings
-from .pydantic_schemas import ExtractedDataWithConfidence
+from .pydantic_schemas import (
+    EXTRACTED_DATA_WITH_CONFIDENCE_ADAPTER,
+    ExtractedDataWithConfidence,
+)
 
 # --- The Master Prompt (remains the same) ---
 MASTER_PROMPT = """
@@ -224,6 +227,14 @@ async def extract_data_from_bill(file: UploadFile) -> ExtractedDataWithConfidenc
     Orchestrates file conversion and AI data extraction using the Gemini 2.5 Pro model.
     """
     file_content = await file.read()
+    return await extract_data_from_pdf_bytes(file_content)
+
+
+async def extract_data_from_pdf_bytes(file_content: bytes) -> ExtractedDataWithConfidence:
+    """
+    Runs the extraction pipeline on raw PDF bytes. Used by the background worker,
+    which receives the uploaded file from the queue instead of an UploadFile.
+    """
     base64_images = convert_pdf_to_base64_images(file_content)
 
     # --- NEW: Gemini API Call ---
@@ -251,10 +262,12 @@ async def extract_data_from_bill(file: UploadFile) -> ExtractedDataWithConfidenc
         # Extract the JSON string from the Gemini response
         result = response.json()
         ai_response_str = result["candidates"][0]["content"]["parts"][0]["text"]
-        ai_response_json = json.loads(ai_response_str)
 
-        # Validate the AI's response against our Pydantic schema
-        validated_data = ExtractedDataWithConfidence(**ai_response_json)
+        # Parse and validate the AI's response against our Pydantic schema in
+        # one pass, without building an intermediate dict
+        validated_data = EXTRACTED_DATA_WITH_CONFIDENCE_ADAPTER.validate_json(
+            ai_response_str
+        )
 
         return validated_data
 
@@ -268,6 +281,11 @@ async def extract_data_from_bill(file: UploadFile) -> ExtractedDataWithConfidenc
             status_code=500, detail="AI returned a malformed or unexpected response."
         )
     except ValidationError as e:
+        if any(err["type"] == "json_invalid" for err in e.errors()):
+            raise HTTPException(
+                status_code=500,
+                detail="AI returned a malformed or unexpected response.",
+            )
         raise HTTPException(
             status_code=500, detail=f"AI response failed validation: {e}"
         )
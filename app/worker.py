@@ -0,0 +1,76 @@
+# app/worker.py
+
+import asyncio
+import base64
+import logging
+from uuid import UUID
+
+from celery import Celery
+from celery.signals import worker_process_init
+
+from . import crud
+from .config import settings
+from .database import AsyncSessionLocal, async_engine
+from .logger import setup_logging
+from .value_extractor import extract_data_from_pdf_bytes
+
+logger = logging.getLogger(__name__)
+
+# The worker runs as its own process (`celery -A app.worker worker`), so the
+# heavy extraction work never competes with the API's event loop. Anything
+# expensive to load (models, clients) should live at module level here so it
+# is warmed once per worker process and shared by every job.
+celery_app = Celery("mediclaim", broker=settings.REDIS_URL, backend=settings.REDIS_URL)
+celery_app.conf.update(
+    task_serializer="json",
+    accept_content=["json"],
+    # Process jobs FIFO, one at a time per worker process, and only ack a job
+    # once it has finished so a crashed worker does not lose the upload.
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    # Keep our queued log handlers instead of Celery's default root logger setup
+    worker_hijack_root_logger=False,
+)
+
+
+@worker_process_init.connect
+def _setup_worker_logging(**kwargs) -> None:
+    # The QueueListener thread doesn't survive a fork, so each pool process
+    # starts its own after being forked rather than inheriting one from import
+    setup_logging()
+
+
+@celery_app.task(name="extract")
+def extract_bill(claim_id: str, file_b64: str) -> str:
+    """
+    Extracts structured data from a queued PDF bill and stores it on the claim.
+    """
+    return asyncio.run(_extract_bill(UUID(claim_id), base64.b64decode(file_b64)))
+
+
+async def _extract_bill(claim_id: UUID, file_content: bytes) -> str:
+    try:
+        async with AsyncSessionLocal() as db:
+            await crud.update_claim_extraction(
+                db, claim_id=claim_id, status="processing"
+            )
+            try:
+                extracted_data = await extract_data_from_pdf_bytes(file_content)
+            except Exception:
+                logger.exception("Extraction failed for claim %s", claim_id)
+                await crud.update_claim_extraction(
+                    db, claim_id=claim_id, status="failed"
+                )
+                return "failed"
+
+            await crud.update_claim_extraction(
+                db,
+                claim_id=claim_id,
+                status="extracted",
+                extracted_data=extracted_data,
+            )
+            return "extracted"
+    finally:
+        # Each job runs in a fresh event loop, so pooled connections from
+        # this loop cannot be reused by the next job.
+        await async_engine.dispose()
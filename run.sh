@@ -1,5 +1,8 @@
 #!/bin/bash
 
+# Background mein extraction worker chalu karein
+celery -A app.worker worker --loglevel=info &
+
 # Background mein FastAPI server chalu karein
 uvicorn app.main:app --host 0.0.0.0 --port 8000 &
 
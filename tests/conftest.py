@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Add the root project directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Settings requires these; the unit tests never call the real services
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
@@ -4,6 +4,7 @@ import io
 import json
 import os
 import sys
+import time
 from typing import Any, Dict, List, Tuple
 
 import requests
@@ -19,6 +20,7 @@ GOLDEN_DIR = "/home/harsh/Desktop/Personal_project/mediclaim_backend/tests/true_
 API_BASE_URL = "http://127.0.0.1:8000/api/v1"
 TEST_USERNAME = "harsh-user"
 TEST_PASSWORD = "harsh-user"
+POLL_INTERVAL_SECONDS = 2
 
 
 def get_auth_token() -> str:
@@ -50,21 +52,37 @@ async def get_prediction(pdf_path: str, token: str) -> Dict[str, Any]:
         )
         response.raise_for_status()
 
-        # Strip confidence scores to compare values directly
-        data_with_confidence = response.json()
-        print(data_with_confidence)
-        simple_data = {}
-        for key, field in data_with_confidence.items():
-            if key != "line_items" and isinstance(field, dict):
-                simple_data[key] = field.get("value")
-
-        simple_line_items = []
-        if "line_items" in data_with_confidence:
-            for item in data_with_confidence["line_items"]:
-                simple_item = {key: field.get("value") for key, field in item.items()}
-                simple_line_items.append(simple_item)
-        simple_data["line_items"] = simple_line_items
-        return simple_data
+    # Extraction runs in the background worker; poll until it finishes
+    claim_id = response.json()["claim_id"]
+    while True:
+        response = requests.get(
+            f"{API_BASE_URL}/claims/{claim_id}/status",
+            headers=headers,
+            proxies=proxies,
+        )
+        response.raise_for_status()
+        claim_status = response.json()
+        if claim_status["status"] not in ("queued", "processing"):
+            break
+        time.sleep(POLL_INTERVAL_SECONDS)
+    if claim_status["status"] != "extracted":
+        raise RuntimeError(f"Extraction failed for {pdf_path}")
+
+    # Strip confidence scores to compare values directly
+    data_with_confidence = claim_status["extracted_data"]
+    print(data_with_confidence)
+    simple_data = {}
+    for key, field in data_with_confidence.items():
+        if key != "line_items" and isinstance(field, dict):
+            simple_data[key] = field.get("value")
+
+    simple_line_items = []
+    if "line_items" in data_with_confidence:
+        for item in data_with_confidence["line_items"]:
+            simple_item = {key: field.get("value") for key, field in item.items()}
+            simple_line_items.append(simple_item)
+    simple_data["line_items"] = simple_line_items
+    return simple_data
 
 
 def compare_fields(
@@ -0,0 +1,120 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.adjudication_cache import (
+    AdjudicationCache,
+    AdjudicationCacheMiss,
+    CacheMode,
+    adjudication_key,
+    cached_adjudication,
+)
+from app.pydantic_schemas import AdjudicatedClaim, ExtractedData, InsuranceDetails
+
+INSURANCE_DETAILS = InsuranceDetails(
+    policy_number="MVP1", insurance_provider="Test Insurance"
+)
+
+
+def make_extracted_data(net_payable_amount=10000):
+    return ExtractedData(
+        hospital_name="City Hospital",
+        patient_name="Test Patient",
+        bill_date=date(2024, 1, 5),
+        admission_date=date(2024, 1, 1),
+        line_items=[],
+        net_payable_amount=net_payable_amount,
+    )
+
+
+class CountingPipeline:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, extracted_data, insurance_details):
+        self.calls += 1
+        return AdjudicatedClaim(
+            hospital_name=extracted_data.hospital_name,
+            patient_name=extracted_data.patient_name,
+            bill_date=extracted_data.bill_date,
+            admission_date=extracted_data.admission_date,
+            adjudicated_line_items=[],
+            total_claimed_amount=extracted_data.net_payable_amount,
+            total_amount_reimbursed=extracted_data.net_payable_amount,
+            adjustments_log=[],
+        )
+
+
+def adjudicate_twice(cache):
+    pipeline = CountingPipeline()
+    adjudicate = cached_adjudication(cache)(pipeline)
+
+    async def run():
+        first = await adjudicate(make_extracted_data(), INSURANCE_DETAILS)
+        second = await adjudicate(make_extracted_data(), INSURANCE_DETAILS)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    return pipeline.calls
+
+
+def stored_keys(cache):
+    return [row[0] for row in cache._connect().execute("SELECT key FROM adjudications")]
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "adjudication_cache.sqlite3")
+
+
+def test_key_depends_on_the_bill():
+    assert adjudication_key(make_extracted_data(), INSURANCE_DETAILS) == (
+        adjudication_key(make_extracted_data(), INSURANCE_DETAILS)
+    )
+    assert adjudication_key(make_extracted_data(), INSURANCE_DETAILS) != (
+        adjudication_key(make_extracted_data(20000), INSURANCE_DETAILS)
+    )
+
+
+def test_enabled_serves_repeats_from_the_cache(cache_path):
+    cache = AdjudicationCache(cache_path, CacheMode.ENABLED)
+    assert adjudicate_twice(cache) == 1
+    assert len(stored_keys(cache)) == 1
+
+
+def test_disabled_never_stores(cache_path):
+    cache = AdjudicationCache(cache_path, "DISABLED")
+    assert adjudicate_twice(cache) == 2
+    assert stored_keys(cache) == []
+
+
+def test_write_only_always_adjudicates_and_stores(cache_path):
+    cache = AdjudicationCache(cache_path, CacheMode.WRITE_ONLY)
+    assert adjudicate_twice(cache) == 2
+    assert len(stored_keys(cache)) == 1
+
+
+def test_read_only_never_stores(cache_path):
+    cache = AdjudicationCache(cache_path, CacheMode.READ_ONLY)
+    assert adjudicate_twice(cache) == 2
+    assert stored_keys(cache) == []
+
+
+def test_read_only_and_replay_serve_stored_results(cache_path):
+    adjudicate_twice(AdjudicationCache(cache_path, CacheMode.WRITE_ONLY))
+
+    assert adjudicate_twice(AdjudicationCache(cache_path, CacheMode.READ_ONLY)) == 0
+    assert adjudicate_twice(AdjudicationCache(cache_path, CacheMode.REPLAY)) == 0
+
+
+def test_replay_miss_is_an_error(cache_path):
+    pipeline = CountingPipeline()
+    adjudicate = cached_adjudication(AdjudicationCache(cache_path, CacheMode.REPLAY))(
+        pipeline
+    )
+
+    with pytest.raises(AdjudicationCacheMiss):
+        asyncio.run(adjudicate(make_extracted_data(), INSURANCE_DETAILS))
+    assert pipeline.calls == 0
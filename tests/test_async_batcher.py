@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from app.async_batcher import AsyncBatcher
+
+
+class DoublingBatcher(AsyncBatcher):
+    """Doubles each number, failing on negative ones."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    async def process_batch(self, items):
+        self.batches.append(items)
+        return [
+            ValueError(f"negative: {item}") if item < 0 else item * 2 for item in items
+        ]
+
+
+class FailingBatcher(AsyncBatcher):
+    async def process_batch(self, items):
+        raise RuntimeError("batch failed")
+
+
+class ShortBatcher(AsyncBatcher):
+    async def process_batch(self, items):
+        return items[:-1]
+
+
+def test_concurrent_submissions_are_batched_in_order():
+    batcher = DoublingBatcher(max_batch_size=3, max_queue_time=0.01)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(n) for n in range(5)))
+
+    # The first three flush as soon as they're queued; the last two on timeout
+    assert asyncio.run(run()) == [0, 2, 4, 6, 8]
+    assert batcher.batches == [[0, 1, 2], [3, 4]]
+
+
+def test_partial_batch_flushes_after_max_queue_time():
+    batcher = DoublingBatcher(max_batch_size=16, max_queue_time=0.01)
+
+    async def run():
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+    assert asyncio.run(run()) == [2, 4]
+    assert batcher.batches == [[1, 2]]
+
+
+def test_exception_result_fails_only_its_caller():
+    batcher = DoublingBatcher(max_batch_size=3)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit(1),
+            batcher.submit(-1),
+            batcher.submit(3),
+            return_exceptions=True,
+        )
+
+    first, second, third = asyncio.run(run())
+    assert (first, third) == (2, 6)
+    assert isinstance(second, ValueError)
+
+
+def test_raising_fails_every_caller():
+    batcher = FailingBatcher(max_batch_size=2)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_wrong_number_of_results_fails_every_caller():
+    batcher = ShortBatcher(max_batch_size=2)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelled_caller_leaves_the_rest_of_the_batch():
+    batcher = DoublingBatcher(max_batch_size=16, max_queue_time=0.01)
+
+    async def run():
+        cancelled = asyncio.ensure_future(batcher.submit(1))
+        waiting = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return await waiting
+
+    assert asyncio.run(run()) == 4
+
+
+def test_process_batch_must_be_overridden():
+    with pytest.raises(NotImplementedError):
+        asyncio.run(AsyncBatcher().process_batch([1]))
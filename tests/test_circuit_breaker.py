@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from app.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+async def succeed():
+    return "ok"
+
+
+async def fail():
+    raise ValueError("LLM unavailable")
+
+
+def make_breaker(cooldown=60.0):
+    return CircuitBreaker("test", failure_threshold=2, window=60.0, cooldown=cooldown)
+
+
+async def fail_times(breaker, times):
+    for _ in range(times):
+        with pytest.raises(ValueError):
+            await breaker.call(fail)
+
+
+def test_opens_after_threshold_failures():
+    breaker = make_breaker()
+
+    async def run():
+        await fail_times(breaker, 1)
+        assert not breaker.is_open
+        await fail_times(breaker, 1)
+        assert breaker.is_open
+
+    asyncio.run(run())
+
+
+def test_success_resets_the_failure_count():
+    breaker = make_breaker()
+
+    async def run():
+        await fail_times(breaker, 1)
+        assert await breaker.call(succeed) == "ok"
+        await fail_times(breaker, 1)
+        assert not breaker.is_open
+
+    asyncio.run(run())
+
+
+def test_open_circuit_rejects_without_making_the_call():
+    breaker = make_breaker()
+    made = []
+
+    def make_call():
+        made.append(True)
+        return succeed()
+
+    async def run():
+        await fail_times(breaker, 2)
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(make_call)
+
+    asyncio.run(run())
+    assert made == []
+
+
+def test_single_trial_call_after_cooldown_closes_the_circuit():
+    breaker = make_breaker(cooldown=0.01)
+
+    async def run():
+        await fail_times(breaker, 2)
+        await asyncio.sleep(0.02)
+        assert not breaker.is_open
+
+        release = asyncio.Event()
+
+        async def slow_success():
+            await release.wait()
+            return "ok"
+
+        trial = asyncio.ensure_future(breaker.call(slow_success))
+        await asyncio.sleep(0)
+        # Other callers are turned away while the trial is running
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(succeed)
+        release.set()
+        assert await trial == "ok"
+        assert not breaker.is_open
+        assert await breaker.call(succeed) == "ok"
+
+    asyncio.run(run())
+
+
+def test_failed_trial_call_reopens_the_circuit():
+    breaker = make_breaker(cooldown=0.01)
+
+    async def run():
+        await fail_times(breaker, 2)
+        await asyncio.sleep(0.02)
+        await fail_times(breaker, 1)
+        assert breaker.is_open
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(succeed)
+
+    asyncio.run(run())
@@ -2,6 +2,8 @@
 if __name__ == "__main__":
     import asyncio
 
+    from app.rules_utils import PolicyContext, get_rule_match_with_llm
+
     # Example item description and sub_limits
     item_description = "Room Charges"
     sub_limits = {
@@ -112,7 +114,10 @@ if __name__ == "__main__":
 
     # Run the LLM-based rule matching
     async def main():
-        rule_name = await get_rule_match_with_llm(item_description, sub_limits)
+        policy = PolicyContext.from_rulebook_entry(
+            {"sum_insured": 500000, "sub_limits": sub_limits}
+        )
+        rule_name = await get_rule_match_with_llm(item_description, policy)
         print(f"Matched Rule: {rule_name}")
 
     asyncio.run(main())
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.config import settings
+from app.rule_matching import match_rules_locally, rule_similarities
+
+THRESHOLD = settings.RULE_MATCH_LOCAL_THRESHOLD
+MARGIN = settings.RULE_MATCH_LOCAL_MARGIN
+
+POLICY = SimpleNamespace(
+    rule_names=("Room Charges", "Pharmacy"),
+    rule_anchors=(
+        ("Room Charges", 0),
+        ("Private Room", 0),
+        ("Pharmacy", 1),
+    ),
+)
+
+
+class StubEmbeddings:
+    """Embeds each known text as a fixed vector, one axis per anchor."""
+
+    def __init__(self, vectors: dict[str, list[float]]):
+        self.vectors = {
+            "Room Charges": [1.0, 0.0, 0.0],
+            "Private Room": [0.0, 1.0, 0.0],
+            "Pharmacy": [0.0, 0.0, 1.0],
+            **vectors,
+        }
+
+    def embed_descriptions(self, descriptions: list[str]) -> np.ndarray:
+        return np.array([self.vectors[d] for d in descriptions], dtype=np.float32)
+
+
+def match(descriptions, vectors, policy=POLICY):
+    service = StubEmbeddings(vectors)
+    similarities = rule_similarities(
+        service.embed_descriptions(descriptions),
+        service.embed_descriptions([text for text, _ in policy.rule_anchors]),
+        policy,
+    )
+    return match_rules_locally(similarities, policy.rule_names)
+
+
+def test_rule_scores_as_its_closest_anchor():
+    service = StubEmbeddings({"Deluxe Room": [0.2, 0.9, 0.1]})
+    similarities = rule_similarities(
+        service.embed_descriptions(["Deluxe Room"]),
+        service.embed_descriptions([text for text, _ in POLICY.rule_anchors]),
+        POLICY,
+    )
+    np.testing.assert_allclose(similarities, [[0.9, 0.1]], rtol=1e-6)
+
+
+def test_clear_cut_match():
+    vectors = {
+        "Deluxe Room": [0.1, 0.95, 0.0],
+        "Syrup": [0.0, 0.1, 0.9],
+    }
+    assert match(["Deluxe Room", "Syrup"], vectors) == {
+        0: "Room Charges",
+        1: "Pharmacy",
+    }
+
+
+def test_below_threshold_is_left_to_the_llm():
+    assert match(["Bed"], {"Bed": [THRESHOLD - 0.1, 0.0, 0.0]}) == {}
+
+
+def test_inside_margin_is_left_to_the_llm():
+    close_call = [0.0, THRESHOLD + 0.1, THRESHOLD + 0.1 - MARGIN / 2]
+    assert match(["Room Medicines"], {"Room Medicines": close_call}) == {}
+
+
+def test_just_outside_margin_matches():
+    clear = [0.0, THRESHOLD + 0.1, THRESHOLD + 0.1 - MARGIN * 2]
+    assert match(["Room Medicines"], {"Room Medicines": clear}) == {0: "Room Charges"}
+
+
+def test_single_rule_needs_only_the_threshold():
+    policy = SimpleNamespace(rule_names=("Pharmacy",), rule_anchors=(("Pharmacy", 0),))
+    assert match(["Syrup"], {"Syrup": [0.0, 0.0, THRESHOLD]}, policy) == {0: "Pharmacy"}
+
+
+def test_policy_without_anchors_matches_nothing():
+    policy = SimpleNamespace(rule_names=(), rule_anchors=())
+    vectors = np.array([[1.0, 0.0, 0.0]], dtype=np.float32)
+    similarities = rule_similarities(vectors, np.empty((0, 3)), policy)
+
+    assert similarities.shape == (1, 0)
+    assert match_rules_locally(similarities, policy.rule_names) == {}
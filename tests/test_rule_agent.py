@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+rules_utils = pytest.importorskip("app.rules_utils")
+
+from langchain_core.messages import AIMessage, ToolMessage  # noqa: E402
+
+ITEM = {
+    "description": "Ambulance Charges",
+    "quantity": 1,
+    "unit_price": 4500,
+    "total_amount": 4500,
+    "status": "Allowed",
+    "allowed_amount": 3000,
+    "disallowed_amount": 1500,
+    "reason": "Capped at Rs. 3,000 as per policy.",
+}
+
+
+def tool_call(name, args, call_id):
+    return {"name": name, "args": args, "id": call_id, "type": "tool_call"}
+
+
+class FakeAgentModel:
+    """Answers each turn with the next scripted message, recording its input."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    async def ainvoke(self, messages, config=None):
+        self.calls.append(messages)
+        if len(self.responses) > 1:
+            return self.responses.pop(0)
+        return self.responses[0]
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    def install(*responses):
+        model = FakeAgentModel(*responses)
+        monkeypatch.setattr(rules_utils, "llm_agent_with_tools", model)
+        return model
+
+    return install
+
+
+def run_agent():
+    return asyncio.run(rules_utils._run_rule_agent("context", config={}))
+
+
+def submit():
+    return AIMessage(
+        content="",
+        tool_calls=[tool_call("submit_adjudicated_line_item", ITEM, "submit")],
+    )
+
+
+def test_submit_ends_the_run(agent):
+    model = agent(submit())
+
+    result = run_agent()
+
+    assert result.allowed_amount == 3000
+    assert result.disallowed_amount == 1500
+    assert len(model.calls) == 1
+
+
+def test_parallel_calculations_are_sent_back_together(agent):
+    model = agent(
+        AIMessage(
+            content="",
+            tool_calls=[
+                tool_call("multiply", {"a": 1, "b": 3000}, "product"),
+                tool_call("subtract", {"a": 4500, "b": 3000}, "difference"),
+            ],
+        ),
+        submit(),
+    )
+
+    run_agent()
+
+    assert len(model.calls) == 2
+    tool_messages = [m for m in model.calls[1] if isinstance(m, ToolMessage)]
+    assert [(m.tool_call_id, float(m.content)) for m in tool_messages] == [
+        ("product", 3000.0),
+        ("difference", 1500.0),
+    ]
+
+
+def test_unknown_tool_raises(agent):
+    agent(AIMessage(content="", tool_calls=[tool_call("modulo", {"a": 1}, "x")]))
+
+    with pytest.raises(ValueError, match="unknown tool"):
+        run_agent()
+
+
+def test_answer_without_tool_calls_raises(agent):
+    agent(AIMessage(content="The allowed amount is 3000."))
+
+    with pytest.raises(ValueError, match="without submitting"):
+        run_agent()
+
+
+def test_gives_up_after_max_turns(agent):
+    model = agent(
+        AIMessage(content="", tool_calls=[tool_call("add", {"a": 1, "b": 2}, "x")])
+    )
+
+    with pytest.raises(ValueError, match="within"):
+        run_agent()
+    assert len(model.calls) == rules_utils.AGENT_MAX_TURNS
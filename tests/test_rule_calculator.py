@@ -0,0 +1,158 @@
+import pytest
+
+from app.data.master_data import POLICY_RULEBOOK
+from app.pydantic_schemas import AdjudicatedLineItem
+from app.rule_calculator import (
+    apply_policy_rule_deterministically,
+    apply_policy_rule_to_rows,
+    can_apply_deterministically,
+)
+
+SUM_INSURED = 1_000_000
+
+
+def make_item(description, quantity, unit_price):
+    return AdjudicatedLineItem(
+        description=description,
+        quantity=quantity,
+        unit_price=unit_price,
+        total_amount=quantity * unit_price,
+        status="Allowed",
+        allowed_amount=quantity * unit_price,
+        disallowed_amount=0,
+    )
+
+
+ROOM_RENT = {
+    "type": "percentage_of_sum_insured",
+    "value": 1,
+    "per": "day",
+    "max_cap_per_day": 7500,
+    "description": "Room rent at 1% of sum insured per day, up to Rs. 7,500 per day.",
+}
+
+
+@pytest.mark.parametrize(
+    "item, rule, expected_limit",
+    [
+        # 1% of 10 lakh is 10,000 a day, capped at 7,500 a day
+        (make_item("Room Rent", 4, 9000), ROOM_RENT, 30000),
+        (
+            make_item("Doctor Consultation", 3, 2500),
+            {"type": "fixed", "value": 2000, "per": "day"},
+            6000,
+        ),
+        (
+            make_item("Cataract Surgery", 2, 50000),
+            {"type": "fixed", "value": 40000, "per": "eye"},
+            80000,
+        ),
+        (
+            make_item("Knee Replacement", 2, 300000),
+            {"type": "fixed_package", "value": 250000, "per": "joint"},
+            500000,
+        ),
+        # Only the first 10 sessions are covered
+        (
+            make_item("Physiotherapy Session", 20, 600),
+            {"type": "fixed", "value": 750, "per": "session", "max_sessions": 10},
+            7500,
+        ),
+        (
+            make_item("Hearing Aid", 2, 20000),
+            {"type": "fixed", "value": 15000, "per": "unit", "max_cap": 25000},
+            25000,
+        ),
+        (
+            make_item("Organ Donor Expenses", 1, 300000),
+            {"type": "percentage_of_sum_insured", "value": 20, "per": "claim"},
+            200000,
+        ),
+    ],
+)
+def test_rule_limit(item, rule, expected_limit):
+    result = apply_policy_rule_deterministically(item, rule, SUM_INSURED)
+    assert result.allowed_amount == pytest.approx(expected_limit)
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        # Maternity packages depend on the delivery type, so carry no value
+        {"type": "fixed_package", "per": "delivery", "normal_delivery": 50000},
+        {"type": "fixed_package", "per": "joint"},
+        {"type": "percentage_of_item", "value": 25, "per": "claim"},
+        {"type": "fixed", "value": 1000, "per": "delivery"},
+    ],
+)
+def test_rules_it_cant_compute_fall_back(rule):
+    item = make_item("Normal Delivery", 1, 80000)
+    assert not can_apply_deterministically(rule)
+    assert apply_policy_rule_deterministically(item, rule, SUM_INSURED) is None
+
+
+def test_capped_item_is_partly_disallowed():
+    item = make_item("Room Rent", 4, 9000)
+    result = apply_policy_rule_deterministically(item, ROOM_RENT, SUM_INSURED)
+
+    assert result.status == "Allowed"
+    assert result.allowed_amount == 30000
+    assert result.disallowed_amount == 6000
+    assert "30,000.00" in result.reason
+    assert ROOM_RENT["description"] in result.reason
+    assert item.allowed_amount == 36000  # the input is left as it was
+
+
+def test_rulebook_room_charges_are_capped_per_day():
+    # The rulebook gives no "per"; the daily cap makes the limit per day
+    rule = POLICY_RULEBOOK["MVP1"]["sub_limits"]["Room Charges"]
+    assert "per" not in rule
+    result = apply_policy_rule_deterministically(
+        make_item("Room Rent", 4, 9000), rule, SUM_INSURED
+    )
+
+    assert result.allowed_amount == 30000
+    assert result.disallowed_amount == 6000
+
+
+def test_zero_limit_disallows_the_item():
+    item = make_item("Ambulance Charges", 1, 4500)
+    rule = {"type": "fixed", "value": 0}
+    result = apply_policy_rule_deterministically(item, rule, SUM_INSURED)
+
+    assert result.status == "Disallowed"
+    assert result.allowed_amount == 0
+    assert result.disallowed_amount == 4500
+
+
+def test_item_under_the_limit_is_unchanged():
+    item = make_item("ICU Charges", 2, 10000)
+    rule = {"type": "percentage_of_sum_insured", "value": 2, "per": "day"}
+    result = apply_policy_rule_deterministically(item, rule, SUM_INSURED)
+
+    assert result == item
+    assert result is not item
+
+
+def test_claim_limit_is_shared_by_the_rows():
+    rule = {"type": "fixed", "value": 3000, "per": "hospitalization"}
+    items = [make_item("Ambulance Charges", 1, 2000)] * 2 + [
+        make_item("Ambulance Pickup", 1, 500)
+    ]
+    results = apply_policy_rule_to_rows(items, rule, SUM_INSURED)
+
+    assert [result.allowed_amount for result in results] == [2000, 1000, 0]
+    assert [result.status for result in results] == ["Allowed", "Allowed", "Disallowed"]
+
+
+def test_unit_limit_applies_per_row_within_the_shared_caps():
+    sessions = {"type": "fixed", "value": 500, "per": "session", "max_sessions": 15}
+    items = [make_item("Physiotherapy", 10, 600), make_item("Physiotherapy", 10, 600)]
+    results = apply_policy_rule_to_rows(items, sessions, SUM_INSURED)
+    # 10 sessions, then the 5 left of the 15 covered
+    assert [result.allowed_amount for result in results] == [5000, 2500]
+
+    hearing_aids = {"type": "fixed", "value": 15000, "per": "unit", "max_cap": 25000}
+    items = [make_item("Hearing Aid", 1, 20000), make_item("Hearing Aid", 1, 20000)]
+    results = apply_policy_rule_to_rows(items, hearing_aids, SUM_INSURED)
+    assert [result.allowed_amount for result in results] == [15000, 10000]
@@ -0,0 +1,149 @@
+import asyncio
+import re
+
+import pytest
+
+rules_utils = pytest.importorskip("app.rules_utils")
+
+from app.circuit_breaker import CircuitBreaker  # noqa: E402
+from app.pydantic_schemas import NumberedRuleMatch, PolicyRuleMatchBatch  # noqa: E402
+
+RULES = ("Room Charges", "Pharmacy")
+_ITEM_RE = re.compile(r"^(\d+)\. '(.*)'$", re.MULTILINE)
+
+
+class FakeMatchChain:
+    """
+    Matches "room" items to Room Charges and the rest to no rule. Items
+    containing "dropped" are left out of answers for several items, those
+    containing "lost" out of every answer, and a prompt with an item containing
+    "fail" raises.
+    """
+
+    def __init__(self, response=None):
+        self.response = response
+        self.calls = []
+
+    async def ainvoke(self, inputs):
+        items = _ITEM_RE.findall(inputs["item_descriptions"])
+        self.calls.append([description for _, description in items])
+        if self.response is not None:
+            return self.response(items)
+        if any("fail" in description for _, description in items):
+            raise RuntimeError("LLM error")
+        return PolicyRuleMatchBatch(
+            matches=[
+                NumberedRuleMatch(
+                    item_number=int(number),
+                    applicable_rule_name=(
+                        "Room Charges" if "room" in description.lower() else None
+                    ),
+                )
+                for number, description in items
+                if "lost" not in description
+                and not ("dropped" in description and len(items) > 1)
+            ]
+        )
+
+
+@pytest.fixture
+def match_chain(monkeypatch):
+    def install(response=None):
+        chain = FakeMatchChain(response)
+        monkeypatch.setattr(rules_utils, "match_chain", chain)
+        # Failed calls here mustn't open the shared breaker for later tests
+        monkeypatch.setattr(
+            rules_utils,
+            "llm_circuit_breaker",
+            CircuitBreaker("test", failure_threshold=5, window=60, cooldown=30),
+        )
+        return chain
+
+    return install
+
+
+def match(descriptions, rules=RULES):
+    return asyncio.run(rules_utils._match_rules_with_llm(descriptions, rules))
+
+
+def test_answers_every_item_in_one_call(match_chain):
+    chain = match_chain()
+
+    assert match(["Room Rent", "Gauze"]) == ["Room Charges", None]
+    assert chain.calls == [["Room Rent", "Gauze"]]
+
+
+def test_left_out_items_are_asked_again_one_by_one(match_chain):
+    chain = match_chain()
+
+    assert match(["Room Rent", "dropped room", "Gauze"]) == [
+        "Room Charges",
+        "Room Charges",
+        None,
+    ]
+    assert chain.calls == [["Room Rent", "dropped room", "Gauze"], ["dropped room"]]
+
+
+def test_item_still_unanswered_gets_an_exception_not_none(match_chain):
+    match_chain()
+
+    room, lost = match(["Room Rent", "lost item"])
+    assert room == "Room Charges"
+    assert isinstance(lost, ValueError)
+
+
+def test_single_unanswered_item_raises(match_chain):
+    match_chain()
+
+    with pytest.raises(ValueError):
+        match(["lost item"])
+
+
+def test_missing_response_raises(match_chain):
+    match_chain(response=lambda items: None)
+
+    with pytest.raises(ValueError):
+        match(["Room Rent"])
+
+
+def test_out_of_range_item_numbers_are_ignored(match_chain):
+    match_chain(
+        response=lambda items: PolicyRuleMatchBatch(
+            matches=[
+                NumberedRuleMatch(item_number=1, applicable_rule_name="Pharmacy"),
+                NumberedRuleMatch(item_number=7, applicable_rule_name="Room Charges"),
+            ]
+        )
+    )
+
+    assert match(["Syrup"]) == ["Pharmacy"]
+
+
+def test_failed_rule_set_fails_only_its_own_items(match_chain):
+    match_chain()
+    batcher = rules_utils.RuleMatchBatcher(max_batch_size=3)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit(("Room Rent", RULES)),
+            batcher.submit(("fail", ("Pharmacy",))),
+            batcher.submit(("Gauze", RULES)),
+            return_exceptions=True,
+        )
+
+    room, failed, gauze = asyncio.run(run())
+    assert (room, gauze) == ("Room Charges", None)
+    assert isinstance(failed, RuntimeError)
+
+
+def test_batch_groups_items_by_rule_set(match_chain):
+    chain = match_chain()
+
+    answers = asyncio.run(
+        rules_utils.RuleMatchBatcher().process_batch(
+            [("Room Rent", RULES), ("Deluxe Room", ("Room Charges",)), ("Gauze", RULES)]
+        )
+    )
+
+    assert answers == ["Room Charges", "Room Charges", None]
+    assert sorted(chain.calls) == [["Deluxe Room"], ["Room Rent", "Gauze"]]
@@ -0,0 +1,320 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("redis")
+
+from redis.exceptions import RedisError  # noqa: E402
+
+from app.pydantic_schemas import AdjudicatedLineItem  # noqa: E402
+from app.rule_match_cache import (  # noqa: E402
+    _MISS,
+    RedisRuleMatchStore,
+    RuleMatchCache,
+    SemanticRuleMatchCache,
+    cache_hit_rates,
+    cached_rule_application,
+    cached_rule_match,
+    lookup_counts,
+    rule_match_key,
+)
+
+POLICY = SimpleNamespace(sub_limits_sha="sha")
+
+
+class CountingMatcher:
+    """A rule matcher that records its calls and can be held until released."""
+
+    def __init__(self, rule_name="Room Charges"):
+        self.rule_name = rule_name
+        self.calls = []
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, item_description, policy):
+        self.calls.append(item_description)
+        await self.release.wait()
+        return self.rule_name
+
+
+class DictRedis:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+
+class BrokenRedis:
+    async def get(self, key):
+        raise RedisError("connection refused")
+
+    async def set(self, key, value, ex=None):
+        raise RedisError("connection refused")
+
+
+def make_item(description="Room Rent"):
+    return AdjudicatedLineItem(
+        description=description,
+        quantity=2,
+        unit_price=5000,
+        total_amount=10000,
+        status="Allowed",
+        allowed_amount=10000,
+        disallowed_amount=0,
+    )
+
+
+def test_cache_evicts_least_recently_used():
+    cache = RuleMatchCache(maxsize=2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+
+    assert cache.get("b") is _MISS
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
+
+
+def test_cached_none_is_not_a_miss():
+    cache = RuleMatchCache(maxsize=2)
+    cache.set("a", None)
+
+    assert cache.get("a") is None
+    assert cache.get("b") is _MISS
+
+
+def unit_vector(index, dim=8):
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[index] = 1.0
+    return vector
+
+
+def test_semantic_cache_matches_similar_vectors_only():
+    cache = SemanticRuleMatchCache(threshold=0.9, maxsize=4)
+    cache.add("sha", unit_vector(0), "Room Charges")
+    cache.add("sha", unit_vector(1), None)
+    near = unit_vector(0) + 0.1 * unit_vector(2)
+    near /= np.linalg.norm(near)
+
+    vectors = np.stack([near, unit_vector(1), unit_vector(3)])
+    assert cache.lookup("sha", vectors) == {0: "Room Charges", 1: None}
+    assert cache.lookup("other", vectors) == {}
+
+
+def test_semantic_cache_overwrites_oldest_entries_once_full():
+    cache = SemanticRuleMatchCache(threshold=0.9, maxsize=3)
+    for index in range(5):
+        cache.add("sha", unit_vector(index), f"Rule {index}")
+
+    vectors = np.stack([unit_vector(index) for index in range(5)])
+    assert cache.lookup("sha", vectors) == {2: "Rule 2", 3: "Rule 3", 4: "Rule 4"}
+
+
+def test_semantic_cache_grows_past_its_initial_buffer():
+    cache = SemanticRuleMatchCache(threshold=0.9, maxsize=200)
+    for index in range(150):
+        cache.add("sha", unit_vector(index, dim=150), f"Rule {index}")
+
+    vectors = np.stack([unit_vector(index, dim=150) for index in (0, 64, 149)])
+    assert cache.lookup("sha", vectors) == {0: "Rule 0", 1: "Rule 64", 2: "Rule 149"}
+
+
+def test_rule_match_key_ignores_case_and_whitespace():
+    assert rule_match_key("Room  Rent", "sha") == rule_match_key(" room rent", "sha")
+    assert rule_match_key("Room Rent", "sha") != rule_match_key("Room Rent", "other")
+
+
+def test_repeated_match_is_served_from_cache():
+    matcher = CountingMatcher(rule_name=None)
+    match = cached_rule_match(RuleMatchCache(maxsize=10))(matcher)
+
+    async def run():
+        first = await match("Room Rent", POLICY)
+        second = await match("ROOM RENT", POLICY)
+        return first, second
+
+    assert asyncio.run(run()) == (None, None)
+    assert matcher.calls == ["Room Rent"]
+
+
+def test_concurrent_matches_share_one_call():
+    matcher = CountingMatcher()
+    match = cached_rule_match(RuleMatchCache(maxsize=10))(matcher)
+
+    async def run():
+        matcher.release.clear()
+        callers = [asyncio.ensure_future(match("Room Rent", POLICY)) for _ in range(3)]
+        await asyncio.sleep(0)
+        matcher.release.set()
+        return await asyncio.gather(*callers)
+
+    assert asyncio.run(run()) == ["Room Charges"] * 3
+    assert matcher.calls == ["Room Rent"]
+
+
+def test_cancelled_caller_does_not_cancel_shared_match():
+    matcher = CountingMatcher()
+    cache = RuleMatchCache(maxsize=10)
+    match = cached_rule_match(cache)(matcher)
+
+    async def run():
+        matcher.release.clear()
+        cancelled = asyncio.ensure_future(match("Room Rent", POLICY))
+        waiting = asyncio.ensure_future(match("Room Rent", POLICY))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        matcher.release.set()
+        return await waiting, cancelled.cancelled()
+
+    assert asyncio.run(run()) == ("Room Charges", True)
+    assert cache.get(rule_match_key("Room Rent", "sha")) == "Room Charges"
+
+
+def test_failed_match_is_not_cached():
+    calls = []
+
+    async def failing_matcher(item_description, policy):
+        calls.append(item_description)
+        raise ValueError("no answer")
+
+    match = cached_rule_match(RuleMatchCache(maxsize=10))(failing_matcher)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await match("Room Rent", POLICY)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_match_falls_back_to_store():
+    store = RedisRuleMatchStore(DictRedis(), ttl_seconds=60)
+    first_matcher = CountingMatcher(rule_name=None)
+    second_matcher = CountingMatcher()
+
+    async def run():
+        # A second process, with its own memory cache, reads the first's answer
+        await cached_rule_match(RuleMatchCache(maxsize=10), store)(first_matcher)(
+            "Room Rent", POLICY
+        )
+        return await cached_rule_match(RuleMatchCache(maxsize=10), store)(
+            second_matcher
+        )("Room Rent", POLICY)
+
+    assert asyncio.run(run()) is None
+    assert second_matcher.calls == []
+
+
+def test_store_treats_redis_errors_as_a_miss():
+    store = RedisRuleMatchStore(BrokenRedis(), ttl_seconds=60)
+
+    async def run():
+        await store.set("key", "Room Charges")
+        return await store.get("key")
+
+    assert asyncio.run(run()) is _MISS
+
+
+def test_store_keeps_none_apart_from_a_miss():
+    client = DictRedis()
+    store = RedisRuleMatchStore(client, ttl_seconds=60, prefix="test")
+
+    async def run():
+        await store.set("key", None)
+        return await store.get("key"), await store.get("other")
+
+    assert asyncio.run(run()) == (None, _MISS)
+    assert list(client.values) == ["test:key"]
+
+
+def test_rule_application_is_cached_and_copied():
+    calls = []
+
+    async def apply_rule(item, policy_rule, sum_insured):
+        calls.append(item.description)
+        await asyncio.sleep(0)
+        return item.model_copy(update={"allowed_amount": 7500})
+
+    cache = RuleMatchCache(maxsize=10)
+    apply = cached_rule_application(cache)(apply_rule)
+    rule = {"type": "fixed", "value": 7500}
+
+    async def run():
+        first, second = await asyncio.gather(
+            apply(make_item(), rule, 100000), apply(make_item(), rule, 100000)
+        )
+        first.status = "Disallowed"
+        return first, second, await apply(make_item(), rule, 100000)
+
+    first, second, third = asyncio.run(run())
+    assert calls == ["Room Rent"]
+    assert first is not second
+    assert second.status == third.status == "Allowed"
+    assert third.allowed_amount == 7500
+
+
+def test_rule_application_falls_back_to_store():
+    store = RedisRuleMatchStore(DictRedis(), ttl_seconds=60, prefix="rule_application")
+    calls = []
+
+    async def apply_rule(item, policy_rule, sum_insured):
+        calls.append(item.description)
+        return item.model_copy(update={"allowed_amount": 7500})
+
+    rule = {"type": "fixed", "value": 7500}
+
+    async def run():
+        for _ in range(2):
+            apply = cached_rule_application(RuleMatchCache(maxsize=10), store)
+            result = await apply(apply_rule)(make_item(), rule, 100000)
+        return result
+
+    result = asyncio.run(run())
+    assert calls == ["Room Rent"]
+    assert isinstance(result, AdjudicatedLineItem)
+    assert result.allowed_amount == 7500
+
+
+def test_lookups_are_counted_by_outcome():
+    store = RedisRuleMatchStore(DictRedis(), ttl_seconds=60)
+    matcher = CountingMatcher()
+    before = lookup_counts.get("Rule match", {}).copy()
+
+    async def run():
+        matcher.release.clear()
+        first = asyncio.ensure_future(
+            cached_rule_match(RuleMatchCache(maxsize=10), store)(matcher)(
+                "Count Me", POLICY
+            )
+        )
+        match = cached_rule_match(RuleMatchCache(maxsize=10), store)(matcher)
+        joined = asyncio.gather(
+            match("Count Me 2", POLICY), match("Count Me 2", POLICY)
+        )
+        await asyncio.sleep(0)
+        matcher.release.set()
+        await first
+        await joined
+        await match("count me 2", POLICY)  # memory
+        # A fresh process-local cache falls back to the store
+        await cached_rule_match(RuleMatchCache(maxsize=10), store)(matcher)(
+            "Count Me", POLICY
+        )
+
+    asyncio.run(run())
+    counts = lookup_counts["Rule match"]
+    added = {
+        outcome: counts[outcome] - before.get(outcome, 0)
+        for outcome in ("miss", "joined", "cache_hit", "store_hit")
+    }
+    assert added == {"miss": 2, "joined": 1, "cache_hit": 1, "store_hit": 1}
+    assert 0 < cache_hit_rates()["Rule match"]["hit_rate"] < 1
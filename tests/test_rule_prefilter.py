@@ -0,0 +1,48 @@
+import pytest
+
+from app.config import settings
+from app.data.master_data import POLICY_RULEBOOK
+from app.rule_matching import could_match_sub_limit, sub_limit_keywords
+
+KEYWORDS = sub_limit_keywords(POLICY_RULEBOOK["MVP1"]["sub_limits"])
+FAR = settings.RULE_MATCH_PREFILTER_THRESHOLD - 0.1
+NEAR = settings.RULE_MATCH_PREFILTER_THRESHOLD + 0.1
+
+
+@pytest.mark.parametrize(
+    "description",
+    [
+        # Brand names with a bare strength
+        "Dolo 650",
+        "Augmentin 625",
+        "Pantop 40",
+        "Pantop-40",
+        # Brand names with a dosage or a bill abbreviation
+        "Monocef 1g",
+        "Tab Crocin",
+        "Inj. Ceftriaxone",
+        # Plural of a master item word ("IV Fluid")
+        "IV Fluids",
+        "Room Rent",
+    ],
+)
+def test_medicines_and_rule_words_reach_the_matcher(description):
+    assert could_match_sub_limit(description, KEYWORDS, FAR)
+
+
+def test_unfamiliar_brand_close_to_a_rule_reaches_the_matcher():
+    assert could_match_sub_limit("Crocin", KEYWORDS, NEAR)
+
+
+def test_unfamiliar_description_far_from_every_rule_is_skipped():
+    assert not could_match_sub_limit("Crocin", KEYWORDS, FAR)
+    assert not could_match_sub_limit("Xyzzy", KEYWORDS, -1.0)
+
+
+def test_keywords_ignore_filler_words_and_plurals():
+    keywords = sub_limit_keywords(
+        {"Ambulance": {"description": "Ambulance charges for the transfer"}}
+    )
+    assert {"ambulance", "charge", "transfer"} <= keywords
+    assert "the" not in keywords
+    assert "for" not in keywords
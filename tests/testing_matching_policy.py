@@ -6,9 +6,8 @@ import sys
 # Add the root project directory to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from app.data.master_data import POLICY_RULEBOOK
 from app.normalization_service import NormalizationService
-from app.rules_utils import get_rule_match_with_llm
+from app.rules_utils import get_policy, get_rule_match_with_llm
 
 # scripts/compare_matching_methods.py
 
@@ -84,12 +83,12 @@ async def run_comparison():
     normalization_service = NormalizationService()
 
     # Prepare data for the test
-    sub_limits = POLICY_RULEBOOK["MVP1"]["sub_limits"]
     descriptions = [case[0] for case in MATCHING_TEST_CASES]
 
     # --- Run the LLM-based method for all items in parallel ---
     print("\nStep 1: Running LLM-based matching (this may take a moment)...")
-    llm_tasks = [get_rule_match_with_llm(desc, sub_limits) for desc in descriptions]
+    policy = get_policy("MVP1")
+    llm_tasks = [get_rule_match_with_llm(desc, policy) for desc in descriptions]
     llm_results = await asyncio.gather(*llm_tasks)
     print("LLM matching complete.")
 